@@ -7,14 +7,28 @@ import requests
 import json
 import random
 import hashlib
-from datetime import datetime, timedelta
-from threading import Thread, Event
+from datetime import datetime, timedelta, timezone
+from threading import Thread, Event, Lock, Semaphore, get_ident, local
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import logging
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
+from requests.adapters import HTTPAdapter
 from flask import Flask
 import re
 import signal
+import socket
 import sys
+import argparse
+import copy
+import sqlite3
+import calendar
+import html
+import tempfile
+import tracemalloc
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import lru_cache
+import numpy as np
 
 # Health check server for Render
 app = Flask(__name__)
@@ -27,14 +41,29 @@ def health():
 def health_check():
     return "OK", 200
 
+# Running bot instance, set in main() so the endpoints can report on it
+bot_instance = None
+
 @app.route('/stats')
 def stats():
-    return {
+    data = {
         "status": "active",
         "blog": "freshfindsstore.blogspot.com",
         "posting_interval": "every hour",
         "last_check": datetime.now().isoformat()
     }
+    if bot_instance is not None:
+        data["gemini"] = bot_instance.gemini_usage_report()
+        data["quota"] = bot_instance.quota_ledger.snapshot()
+        data["archived_posts"] = bot_instance.post_archive.count()
+    return data
+
+@app.route('/debug/memory')
+def memory_diagnostics():
+    # Opt-in: only available when started with BOT_MEMORY_DIAGNOSTICS=1
+    if bot_instance is None or bot_instance.memory_monitor is None:
+        return {"enabled": False, "hint": "set BOT_MEMORY_DIAGNOSTICS=1"}, 404
+    return bot_instance.memory_monitor.report()
 
 # Configure logging
 logging.basicConfig(
@@ -46,6 +75,1930 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Relative weight of each signal in the product score
+DEFAULT_SCORE_WEIGHTS = {
+    "quality": 0.30,          # Bayesian-smoothed star rating
+    "popularity": 0.15,       # Review volume
+    "price": 0.15,            # Closeness to the best-converting price band
+    "asin_recency": 0.20,     # Time since this ASIN was last posted
+    "category_recency": 0.10, # Time since this category was last posted
+    "ctr": 0.07,              # Historical click-through rate of the ASIN
+    "category_ctr": 0.03,     # Historical click-through rate of the category
+    "exploration": 0.05       # Random jitter so equal scores still rotate
+}
+
+class ProductScorer:
+    """Vectorized product scoring engine used to pick the top-k candidates per cycle"""
+
+    def __init__(self, weights=None, target_price=60.0, price_spread=0.6,
+                 asin_half_life=7 * 24 * 3600, category_half_life=6 * 3600,
+                 rating_prior=4.0, rating_prior_weight=50, ctr_prior=0.02, seed=None):
+        self.weights = dict(DEFAULT_SCORE_WEIGHTS, **(weights or {}))
+        self.target_price = target_price
+        self.price_spread = price_spread
+        self.asin_half_life = asin_half_life
+        self.category_half_life = category_half_life
+        self.rating_prior = rating_prior
+        self.rating_prior_weight = rating_prior_weight
+        self.ctr_prior = ctr_prior
+        self.rng = np.random.default_rng(seed)
+        
+        # ASINs and categories are mapped to dense row ids so per-item history
+        # lives in flat arrays that can be gathered in a single NumPy operation
+        self.asin_ids = {}
+        self.category_ids = {}
+        self.asin_last_posted = np.zeros(0)
+        self.asin_ctr = np.zeros(0)
+        self.category_last_posted = np.zeros(0)
+        self.category_ctr = np.zeros(0)
+        
+        # Candidate pool as parallel arrays, loaded once by set_candidates and
+        # re-scored on every tick; None until loaded
+        self.candidates = None
+
+    @staticmethod
+    def _grow(array, size, fill):
+        """Grow a history array geometrically so registration stays amortized O(1)"""
+        if size <= len(array):
+            return array
+        grown = np.full(max(size, 2 * len(array), 64), fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def asin_id(self, asin):
+        """Return the dense row id for an ASIN, registering it if new"""
+        row = self.asin_ids.get(asin)
+        if row is None:
+            row = self.asin_ids[asin] = len(self.asin_ids)
+            self.asin_last_posted = self._grow(self.asin_last_posted, row + 1, 0.0)
+            self.asin_ctr = self._grow(self.asin_ctr, row + 1, np.nan)
+        return row
+
+    def category_id(self, category):
+        """Return the dense row id for a category, registering it if new"""
+        row = self.category_ids.get(category)
+        if row is None:
+            row = self.category_ids[category] = len(self.category_ids)
+            self.category_last_posted = self._grow(self.category_last_posted, row + 1, 0.0)
+            self.category_ctr = self._grow(self.category_ctr, row + 1, np.nan)
+        return row
+
+    def record_post(self, asin, category, when=None):
+        """Remember when an ASIN and its category were last posted"""
+        when = time.time() if when is None else when
+        # Resolve ids first: registering a new id may replace the arrays
+        asin_row, category_row = self.asin_id(asin), self.category_id(category)
+        self.asin_last_posted[asin_row] = when
+        self.category_last_posted[category_row] = when
+
+    def last_posted(self, asin):
+        """When this process last saw the ASIN posted; 0 if never"""
+        row = self.asin_ids.get(asin)
+        return float(self.asin_last_posted[row]) if row is not None else 0.0
+
+    def seed_post_time(self, asin, when):
+        """Merge a known publish time (e.g. from the post archive) into the ASIN history"""
+        row = self.asin_id(asin)
+        self.asin_last_posted[row] = max(self.asin_last_posted[row], when)
+
+    def export_post_times(self):
+        """Non-zero last-posted times by ASIN and category, for state snapshots"""
+        return {
+            "asins": {asin: float(self.asin_last_posted[row]) for asin, row in self.asin_ids.items()
+                      if self.asin_last_posted[row]},
+            "categories": {category: float(self.category_last_posted[row]) for category, row in self.category_ids.items()
+                           if self.category_last_posted[row]}
+        }
+
+    def import_post_times(self, times):
+        """Merge times saved by export_post_times, keeping whichever is newer"""
+        for asin, when in times.get("asins", {}).items():
+            self.seed_post_time(asin, when)
+        for category, when in times.get("categories", {}).items():
+            row = self.category_id(category)
+            self.category_last_posted[row] = max(self.category_last_posted[row], when)
+
+    def record_click_through(self, asin, ctr):
+        """Store the historical click-through rate for an ASIN"""
+        row = self.asin_id(asin)
+        self.asin_ctr[row] = ctr
+
+    def record_category_click_through(self, category, ctr):
+        """Store the historical click-through rate for a category"""
+        row = self.category_id(category)
+        self.category_ctr[row] = ctr
+
+    def score(self, ratings, reviews, prices, asin_ids, category_ids, now=None):
+        """Score a batch of candidates given as parallel arrays; returns one float per candidate"""
+        now = time.time() if now is None else now
+        ratings = np.asarray(ratings, dtype=np.float64)
+        reviews = np.asarray(reviews, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        asin_ids = np.asarray(asin_ids, dtype=np.intp)
+        category_ids = np.asarray(category_ids, dtype=np.intp)
+        w = self.weights
+        
+        # Shrink ratings with few reviews towards the prior, then map 1-5 stars to 0-1
+        smoothed = ((ratings * reviews + self.rating_prior * self.rating_prior_weight)
+                    / (reviews + self.rating_prior_weight))
+        quality = (smoothed - 1.0) / 4.0
+        
+        popularity = np.minimum(np.log1p(reviews) / np.log1p(10000), 1.0)
+        
+        # Gaussian in log-price space centred on the target price
+        log_ratio = np.log(np.maximum(prices, 0.01) / self.target_price)
+        price_fit = np.exp(-0.5 * (log_ratio / self.price_spread) ** 2)
+        
+        # Never-posted items have last_posted == 0, i.e. a huge age and full staleness
+        asin_age = now - self.asin_last_posted[asin_ids]
+        asin_recency = -np.expm1(-asin_age * (np.log(2) / self.asin_half_life))
+        category_age = now - self.category_last_posted[category_ids]
+        category_recency = -np.expm1(-category_age * (np.log(2) / self.category_half_life))
+        
+        ctr = self.asin_ctr[asin_ids]
+        ctr = np.where(np.isnan(ctr), self.ctr_prior, ctr)
+        ctr_score = -np.expm1(-ctr / self.ctr_prior)
+        category_ctr = self.category_ctr[category_ids]
+        category_ctr = np.where(np.isnan(category_ctr), self.ctr_prior, category_ctr)
+        category_ctr_score = -np.expm1(-category_ctr / self.ctr_prior)
+        
+        scores = (w["quality"] * quality
+                  + w["popularity"] * popularity
+                  + w["price"] * price_fit
+                  + w["asin_recency"] * asin_recency
+                  + w["category_recency"] * category_recency
+                  + w["ctr"] * ctr_score
+                  + w["category_ctr"] * category_ctr_score)
+        if w["exploration"]:
+            scores += w["exploration"] * self.rng.random(len(scores))
+        return scores
+
+    def set_candidates(self, products):
+        """Load the candidate pool; select() scores it every tick until it is replaced"""
+        self.candidates = list(products)
+        count = len(self.candidates)
+        self.candidate_ratings = np.fromiter((p.rating for p in self.candidates), dtype=np.float64, count=count)
+        self.candidate_reviews = np.fromiter((p.reviews for p in self.candidates), dtype=np.float64, count=count)
+        self.candidate_prices = np.fromiter((parse_price(p.price) for p in self.candidates), dtype=np.float64, count=count)
+        self.candidate_asin_ids = np.fromiter((self.asin_id(p.asin) for p in self.candidates), dtype=np.intp, count=count)
+        self.candidate_category_ids = np.fromiter((self.category_id(p.category) for p in self.candidates),
+                                                  dtype=np.intp, count=count)
+
+    @staticmethod
+    def top_k(scores, k):
+        """Indices of the k highest scores, best first, without a full sort"""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(scores):
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    @classmethod
+    def top_k_distinct(cls, scores, keys, k):
+        """Like top_k, but keep only the best row per key (an ASIN listed in several categories)"""
+        size = k
+        while True:
+            rows = cls.top_k(scores, size)
+            _, first = np.unique(keys[rows], return_index=True)
+            rows = rows[np.sort(first)]
+            if len(rows) >= k or size >= len(scores):
+                return rows[:k]
+            size = min(2 * size, len(scores))
+
+    def select(self, k=3, exclude=(), now=None):
+        """Score the candidate pool and return the top-k products with distinct ASINs, best first.
+        
+        ASINs in exclude (e.g. unavailable ones) are never picked. The returned
+        Product objects belong to the pool, so copy them before changing them.
+        """
+        if not self.candidates:
+            return []
+        scores = self.score(self.candidate_ratings, self.candidate_reviews, self.candidate_prices,
+                            self.candidate_asin_ids, self.candidate_category_ids, now)
+        if exclude:
+            blocked = np.zeros(len(self.asin_ids), dtype=bool)
+            blocked[[self.asin_ids[asin] for asin in exclude if asin in self.asin_ids]] = True
+            scores[blocked[self.candidate_asin_ids]] = -np.inf
+        rows = self.top_k_distinct(scores, self.candidate_asin_ids, k)
+        return [self.candidates[i] for i in rows if scores[i] > -np.inf]
+
+def parse_price(price):
+    """Convert a display price like '$129.99' to a float"""
+    try:
+        return float(str(price).replace('$', '').replace(',', ''))
+    except ValueError:
+        return 0.0
+
+@lru_cache(maxsize=None)
+def category_features(category):
+    """Feature bullets for a category, built once and shared by every product in it"""
+    return tuple(sys.intern(feature) for feature in (
+        f"Premium quality {category.replace('-', ' ')} construction",
+        "High customer satisfaction rating",
+        "Amazon Prime eligible with fast shipping",
+        "1-year manufacturer warranty included",
+        "30-day hassle-free return policy"
+    ))
+
+class Product:
+    """Compact product record - slotted, with the feature bullets shared per category"""
+
+    __slots__ = ('title', 'price', 'rating', 'reviews', 'asin', 'category', 'image', 'affiliate_link')
+
+    def __init__(self, title, price, rating, reviews, asin, category, image=None, affiliate_link=None):
+        self.title = title
+        self.price = price
+        self.rating = rating
+        self.reviews = reviews
+        self.asin = asin
+        self.category = sys.intern(category)
+        self.image = image
+        self.affiliate_link = affiliate_link
+
+    @property
+    def features(self):
+        return category_features(self.category)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['features'] = list(self.features)
+        return data
+
+class PostRecord:
+    """Compact archived-post row"""
+
+    __slots__ = ('post_id', 'url', 'asin', 'title', 'labels', 'published')
+
+    def __init__(self, post_id, url, asin, title, labels, published):
+        self.post_id = post_id
+        self.url = url
+        self.asin = asin
+        self.title = title
+        self.labels = labels
+        self.published = published
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# Writing instructions shared by single and batch Gemini prompts
+SEO_INSTRUCTIONS = """Write an SEO-optimized review including:
+1. Catchy title with power words
+2. Brief meta description (under 150 chars)
+3. Engaging intro highlighting product appeal
+4. Key features and benefits
+5. Pros and cons analysis
+6. Customer review summary
+7. Strong purchase call-to-action
+
+Keep it 600-800 words, natural and trustworthy tone."""
+
+GEMINI_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "candidateCount": 1
+}
+
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
+]
+
+# Per-item structure requested from Gemini in batch mode
+GEMINI_BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "index": {"type": "INTEGER"},
+            "title": {"type": "STRING"},
+            "meta_description": {"type": "STRING"},
+            "content": {"type": "STRING"}
+        },
+        "required": ["index", "title", "meta_description", "content"]
+    }
+}
+
+def parse_ai_json(content, container='{'):
+    """Extract and parse the JSON value from raw Gemini output; raises ValueError"""
+    # Remove code blocks and markdown
+    content = re.sub(r'```json\s*', '', content)
+    content = re.sub(r'```\s*', '', content)
+    content = content.strip()
+    
+    # Find JSON boundaries ('{' for a single article, '[' for a batch)
+    closing = '}' if container == '{' else ']'
+    json_start = content.find(container)
+    json_end = content.rfind(closing) + 1
+    if json_start < 0 or json_end <= json_start:
+        raise ValueError("no JSON found in AI response")
+    json_content = content[json_start:json_end]
+    
+    # Clean control characters that cause JSON parsing issues
+    json_content = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_content)
+    json_content = json_content.replace('\n', ' ').replace('\r', ' ')
+    json_content = re.sub(r'\s+', ' ', json_content)
+    
+    return json.loads(json_content)
+
+def gemini_quota_error(response):
+    """Classify a Gemini 429 as ('daily', delay) or ('rate', delay).
+    
+    Only a QuotaFailure naming a per-day quota is the daily window; per-minute
+    limits and bare RESOURCE_EXHAUSTED responses are rate limits. delay is the
+    Retry-After header or the RetryInfo retryDelay in seconds, or None.
+    """
+    delay = None
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        delay = float(retry_after)
+    try:
+        details = response.json().get('error', {}).get('details', [])
+    except (ValueError, AttributeError):
+        details = []
+    window = "rate"
+    for detail in details if isinstance(details, list) else []:
+        if not isinstance(detail, dict):
+            continue
+        for violation in detail.get('violations', []) or []:
+            quota = f"{violation.get('quotaId', '')} {violation.get('quotaMetric', '')}"
+            if 'perday' in quota.lower().replace('_', '').replace('-', ''):
+                window = "daily"
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)s', str(detail.get('retryDelay', '')))
+        if match and delay is None:
+            delay = float(match.group(1))
+    return window, delay
+
+def is_valid_article(item):
+    """Check that an AI item has non-empty title, meta_description and content strings"""
+    return (isinstance(item, dict) and
+            all(isinstance(item.get(key), str) and item[key].strip()
+                for key in ('title', 'meta_description', 'content')))
+
+# Tags (and their attributes) allowed in AI-generated article HTML
+ARTICLE_TAGS = {
+    "p": (), "br": (), "hr": (), "strong": (), "b": (), "em": (), "i": (), "u": (), "span": ("class",),
+    "h2": (), "h3": (), "h4": (), "ul": (), "ol": (), "li": (), "blockquote": (), "div": ("class",),
+    "a": ("href", "title"), "table": (), "thead": (), "tbody": (), "tr": (), "th": (), "td": (),
+}
+INLINE_TAGS = {tag: ARTICLE_TAGS[tag] for tag in ("strong", "b", "em", "i", "u", "br")}
+VOID_TAGS = frozenset(("br", "hr"))
+# An opening tag of these closes an open sibling of the same name (<li>a<li>b)
+SIBLING_CLOSING_TAGS = frozenset(("p", "li", "tr", "td", "th"))
+# Dropped together with everything up to their closing tag
+DROP_CONTENT_TAGS = frozenset(("script", "style", "iframe", "object", "embed", "noscript", "template", "textarea", "svg", "math"))
+SAFE_URL_SCHEMES = ("http:", "https:", "mailto:")
+ARTICLE_MAX_CHARS = 20000
+JSON_ARTIFACTS = str.maketrans('', '', '{}"')
+
+@lru_cache(maxsize=None)
+def _closing_tag_pattern(name):
+    # ASCII-only case folding, as HTML tag names are; lowercasing the whole
+    # input instead can change its length ('İ' -> 'i̇') and shift every offset
+    return re.compile(f'</{name}', re.IGNORECASE | re.ASCII)
+
+def _tag_name(text, start):
+    end = start
+    while end < len(text) and (text[end].isalnum() and text[end].isascii()):
+        end += 1
+    return text[start:end].lower(), end
+
+def _sanitize_attributes(tag, source, allowed):
+    """Scan `name=value` pairs left to right, keeping allowed, safe ones"""
+    kept = []
+    i, n = 0, len(source)
+    while i < n:
+        if source[i].isspace() or source[i] == '/':
+            i += 1
+            continue
+        start = i
+        while i < n and not source[i].isspace() and source[i] not in '=/':
+            i += 1
+        name = source[start:i].lower()
+        while i < n and source[i].isspace():
+            i += 1
+        value = None
+        if i < n and source[i] == '=':
+            i += 1
+            while i < n and source[i].isspace():
+                i += 1
+            if i < n and source[i] in '"\'':
+                end = source.find(source[i], i + 1)
+                end = n if end < 0 else end
+                value = source[i + 1:end]
+                i = end + 1
+            else:
+                start = i
+                while i < n and not source[i].isspace():
+                    i += 1
+                value = source[start:i]
+        if name not in allowed or value is None:
+            continue
+        value = html.unescape(value).strip()
+        if name == "href":
+            scheme = value.split('/', 1)[0].lower()
+            if ':' in scheme and not scheme.startswith(SAFE_URL_SCHEMES):
+                continue
+        kept.append(f' {name}="{html.escape(value)}"')
+    if tag == "a":
+        kept.append(' rel="nofollow noopener"')
+    return ''.join(kept)
+
+def sanitize_html(text, allowed_tags=ARTICLE_TAGS, max_length=ARTICLE_MAX_CHARS, max_depth=32):
+    """Clean untrusted HTML in one left-to-right pass.
+    
+    Tags and attributes outside allowed_tags are dropped (script/style-like tags
+    with their content), text is re-escaped, closing tags are matched against a
+    stack of open tags capped at max_depth, and everything still open at the end
+    is closed. Visible text is capped at max_length characters, cut on a word
+    boundary. Every scan moves forward through the input, so the work is linear
+    in its length whatever the markup looks like.
+    """
+    parts = []
+    stack = []
+    budget = max_length
+    pos, n = 0, len(text)
+    next_gt = -1
+
+    def emit_text(chunk):
+        nonlocal budget
+        chunk = html.unescape(chunk)
+        if len(chunk) > budget:
+            cut = chunk.rfind(' ', 0, budget + 1)
+            if cut < 0:
+                # One long word: cut it only if nothing has been written yet
+                cut = budget if budget == max_length else 0
+            chunk = chunk[:cut].rstrip() + "…"
+            budget = -1
+        else:
+            budget -= len(chunk)
+        parts.append(html.escape(chunk, quote=False))
+
+    while pos < n and budget >= 0:
+        lt = text.find('<', pos)
+        if lt < 0:
+            emit_text(text[pos:])
+            break
+        if lt > pos:
+            emit_text(text[pos:lt])
+            if budget < 0:
+                break
+        
+        if text.startswith('<!--', lt):
+            end = text.find('-->', lt + 4)
+            pos = n if end < 0 else end + 3
+            continue
+        if next_gt <= lt:
+            next_gt = text.find('>', lt + 1)
+        if next_gt < 0:
+            # No tag can close any more: the rest is text
+            emit_text(text[lt:])
+            break
+        closing = text.startswith('</', lt)
+        name, name_end = _tag_name(text, lt + (2 if closing else 1))
+        if not name:
+            if text.startswith(('<!', '<?'), lt):
+                pos = next_gt + 1  # doctype / processing instruction
+            else:
+                emit_text('<')
+                pos = lt + 1
+            continue
+        pos = next_gt + 1
+        
+        if name in DROP_CONTENT_TAGS and not closing:
+            match = _closing_tag_pattern(name).search(text, pos)
+            if match is None:
+                break
+            pos = match.start()
+            continue
+        if name not in allowed_tags:
+            continue
+        if closing:
+            if name in stack:
+                while stack:
+                    open_tag = stack.pop()
+                    parts.append(f'</{open_tag}>')
+                    if open_tag == name:
+                        break
+            continue
+        if name in VOID_TAGS:
+            parts.append(f'<{name}>')
+            continue
+        if name in SIBLING_CLOSING_TAGS and stack and stack[-1] == name:
+            parts.append(f'</{stack.pop()}>')
+        if len(stack) < max_depth:
+            parts.append(f'<{name}{_sanitize_attributes(name, text[name_end:next_gt], allowed_tags[name])}>')
+            stack.append(name)
+    
+    parts.extend(f'</{tag}>' for tag in reversed(stack))
+    return ''.join(parts)
+
+def clean_article(item):
+    """The title/meta/content of a validated AI article, with sanitized content HTML"""
+    return {
+        "title": item['title'],
+        "meta_description": item['meta_description'],
+        "content": sanitize_html(item['content'])
+    }
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised instead of starting an upstream call once the cycle budget is spent"""
+
+class Deadline:
+    """Time budget shared by every upstream call and retry wait in a cycle.
+    
+    Timeouts shrink as the budget is consumed, and waits wake up immediately
+    when shutdown is requested. A Deadline with no budget only tracks shutdown.
+    timeout_scale multiplies every per-request timeout cap (the fault harness
+    runs with compressed timeouts).
+    """
+
+    def __init__(self, seconds=None, shutdown_event=None, expires_at=None, timeout_scale=1.0):
+        if expires_at is None:
+            expires_at = time.monotonic() + seconds if seconds is not None else float('inf')
+        self.expires_at = expires_at
+        self.shutdown_event = shutdown_event
+        self.timeout_scale = timeout_scale
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0 or (self.shutdown_event is not None and self.shutdown_event.is_set())
+
+    def within(self, seconds=None, reserve=0):
+        """Sub-budget capped at `seconds` that ends `reserve` seconds before this one"""
+        expires_at = self.expires_at - reserve
+        if seconds is not None:
+            expires_at = min(expires_at, time.monotonic() + seconds)
+        return Deadline(shutdown_event=self.shutdown_event, expires_at=expires_at, timeout_scale=self.timeout_scale)
+
+    def timeout(self, cap):
+        """Request timeout: the smaller of cap and the remaining budget"""
+        if self.expired():
+            raise DeadlineExceeded("cycle deadline reached" if self.remaining() <= 0 else "shutdown requested")
+        return min(cap * self.timeout_scale, self.remaining())
+
+    def sleep(self, seconds):
+        """Interruptible wait; returns False if the caller should stop retrying"""
+        if self.expired() or seconds >= self.remaining():
+            return False
+        if self.shutdown_event is not None:
+            self.shutdown_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+        return not self.expired()
+
+class QuotaLedger:
+    """Persistent usage counters per upstream and credential, in daily and monthly windows.
+    
+    Credentials are stored as a short SHA-256 fingerprint, never the secret itself.
+    Windows are calendar days and months in UTC, matching how Google and Bitly reset quotas.
+    """
+
+    WINDOWS = ("daily", "monthly")
+
+    def __init__(self, path, limits, reserve_fraction=0.1):
+        self.limits = limits
+        self.reserve_fraction = reserve_fraction
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    upstream TEXT NOT NULL,
+                    credential TEXT NOT NULL,
+                    window TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    used INTEGER NOT NULL DEFAULT 0,
+                    exhausted INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (upstream, credential, window, period)
+                )
+            """)
+
+    @staticmethod
+    def credential_id(secret):
+        """Stable, non-reversible identifier for a credential"""
+        return hashlib.sha256((secret or "").encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _periods(now):
+        """Current period key and elapsed fraction of it for each window"""
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        day_elapsed = (moment.hour * 3600 + moment.minute * 60 + moment.second) / 86400
+        days_in_month = calendar.monthrange(moment.year, moment.month)[1]
+        return {
+            "daily": (moment.strftime("%Y-%m-%d"), day_elapsed),
+            "monthly": (moment.strftime("%Y-%m"), (moment.day - 1 + day_elapsed) / days_in_month)
+        }
+
+    def record(self, upstream, credential, count=1, now=None):
+        """Count calls made against an upstream with the given credential"""
+        now = time.time() if now is None else now
+        with self.lock, self.conn:
+            for window, (period, _) in self._periods(now).items():
+                self.conn.execute("""
+                    INSERT INTO quota_usage (upstream, credential, window, period, used, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (upstream, credential, window, period)
+                    DO UPDATE SET used = used + excluded.used, updated_at = excluded.updated_at
+                """, (upstream, credential, window, period, count, now))
+
+    def seconds_left(self, window, now=None):
+        """Seconds until the current period of the window resets"""
+        now = time.time() if now is None else now
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        if window == "daily":
+            return 86400 * (1 - self._periods(now)["daily"][1])
+        days_in_month = calendar.monthrange(moment.year, moment.month)[1]
+        return 86400 * days_in_month * (1 - self._periods(now)["monthly"][1])
+
+    def mark_exhausted(self, upstream, credential, window, now=None):
+        """Record that the upstream refused us (e.g. HTTP 429) for the rest of the window"""
+        now = time.time() if now is None else now
+        period = self._periods(now)[window][0]
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO quota_usage (upstream, credential, window, period, exhausted, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (upstream, credential, window, period)
+                DO UPDATE SET exhausted = 1, updated_at = excluded.updated_at
+            """, (upstream, credential, window, period, now))
+
+    def usage(self, upstream, credential, now=None):
+        """Usage, limit and exhaustion for each window in the current period"""
+        now = time.time() if now is None else now
+        limits = self.limits.get(upstream, {})
+        result = {}
+        with self.lock:
+            for window, (period, elapsed) in self._periods(now).items():
+                row = self.conn.execute("""
+                    SELECT used, exhausted FROM quota_usage
+                    WHERE upstream = ? AND credential = ? AND window = ? AND period = ?
+                """, (upstream, credential, window, period)).fetchone()
+                used, exhausted = row if row else (0, 0)
+                result[window] = {
+                    "period": period,
+                    "used": used,
+                    "limit": limits.get(window),
+                    "exhausted": bool(exhausted),
+                    "elapsed": elapsed
+                }
+        return result
+
+    def plan(self, upstream, credential, now=None):
+        """Return 'ok', 'degrade' or 'exhausted' for the next call.
+        
+        'degrade' is returned ahead of the limit when the reserve is reached or
+        usage is running ahead of an even spread over the window, so callers can
+        fall back to cheaper paths before the upstream starts refusing us.
+        """
+        decision = "ok"
+        for window, info in self.usage(upstream, credential, now).items():
+            limit = info["limit"]
+            if info["exhausted"] or (limit is not None and info["used"] >= limit):
+                return "exhausted"
+            if limit is None:
+                continue
+            burst = max(1, int(limit * 0.05))
+            paced_budget = limit * info["elapsed"] + burst
+            if limit - info["used"] <= limit * self.reserve_fraction or info["used"] >= paced_budget:
+                decision = "degrade"
+        return decision
+
+    def snapshot(self, now=None):
+        """All counters for the current periods, for the /stats endpoint"""
+        now = time.time() if now is None else now
+        periods = {window: period for window, (period, _) in self._periods(now).items()}
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT upstream, credential, window, period, used, exhausted FROM quota_usage
+                WHERE (window = 'daily' AND period = ?) OR (window = 'monthly' AND period = ?)
+                ORDER BY upstream, credential, window
+            """, (periods["daily"], periods["monthly"])).fetchall()
+        report = {}
+        for upstream, credential, window, period, used, exhausted in rows:
+            entry = report.setdefault(upstream, {}).setdefault(credential, {})
+            entry[window] = {
+                "period": period,
+                "used": used,
+                "limit": self.limits.get(upstream, {}).get(window),
+                "exhausted": bool(exhausted)
+            }
+        for upstream, credentials in report.items():
+            for credential in credentials:
+                credentials[credential]["plan"] = self.plan(upstream, credential, now)
+        return report
+
+class HostThrottle:
+    """Per-host politeness: caps concurrent requests and spaces out request starts"""
+
+    def __init__(self, max_concurrent=4, min_interval=0.25):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.lock = Lock()
+        self.hosts = {}
+
+    def _host_state(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = {"semaphore": Semaphore(self.max_concurrent), "next_start": 0.0}
+            return self.hosts[host]
+
+    def run(self, url, func):
+        """Call func() once the host of url has a free slot and its spacing has elapsed"""
+        state = self._host_state(urlparse(url).netloc)
+        with state["semaphore"]:
+            with self.lock:
+                start_at = max(time.monotonic(), state["next_start"])
+                state["next_start"] = start_at + self.min_interval
+            delay = start_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            return func()
+
+class AsinValidator:
+    """Background availability checks for catalog ASINs, cached in SQLite with a TTL.
+    
+    Results are 'ok', 'dead' (404/410), 'redirected' (the product page moved to
+    another ASIN) or 'unknown' (blocked, throttled or network error). Only dead
+    and redirected ASINs are reported as unavailable; unknown results are kept
+    on a short TTL so they get retried soon.
+    """
+
+    def __init__(self, path, base_url="https://www.amazon.com", ttl=24 * 3600, unknown_ttl=3600,
+                 concurrency=16, per_host_concurrency=4, per_host_interval=0.25, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.unknown_ttl = unknown_ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.throttle = HostThrottle(per_host_concurrency, per_host_interval)
+        self.sessions = local()
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS asin_status (
+                    asin TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    http_status INTEGER,
+                    final_asin TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+        self.unavailable_asins = self._load_unavailable()
+
+    def reload(self):
+        """Re-read unavailable ASINs, e.g. after another process validated them"""
+        self.unavailable_asins = self._load_unavailable()
+
+    def _load_unavailable(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT asin FROM asin_status WHERE status IN ('dead', 'redirected')").fetchall()
+        return frozenset(asin for (asin,) in rows)
+
+    def _session(self):
+        """One pooled HTTP session per worker thread"""
+        session = getattr(self.sessions, "session", None)
+        if session is None:
+            session = self.sessions.session = requests.Session()
+            session.headers['User-Agent'] = 'Amazon-Affiliate-Bot/1.0'
+        return session
+
+    def stale(self, asins, now=None):
+        """ASINs that were never checked or whose cached result has expired"""
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = dict(self.conn.execute("SELECT asin, checked_at + CASE status WHEN 'unknown' THEN ? ELSE ? END "
+                                          "FROM asin_status", (self.unknown_ttl, self.ttl)).fetchall())
+        return [asin for asin in dict.fromkeys(asins) if rows.get(asin, 0) <= now]
+
+    def check(self, asin):
+        """Check one ASIN; returns (asin, status, http_status, final_asin)"""
+        url = f"{self.base_url}/dp/{asin}"
+        try:
+            response = self.throttle.run(url, lambda: self._session().get(
+                url, timeout=self.timeout, allow_redirects=False, stream=True))
+            response.close()
+        except requests.exceptions.RequestException:
+            return asin, "unknown", None, None
+        
+        if response.status_code == 200:
+            return asin, "ok", 200, asin
+        if response.status_code in [404, 410]:
+            return asin, "dead", response.status_code, None
+        if response.status_code in [301, 302, 303, 307, 308]:
+            match = re.search(r'/dp/([A-Z0-9]{10})', response.headers.get('Location', ''))
+            if match and match.group(1) != asin:
+                return asin, "redirected", response.status_code, match.group(1)
+            if match:
+                return asin, "ok", response.status_code, asin
+        return asin, "unknown", response.status_code, None
+
+    def validate(self, asins, shutdown_event=None):
+        """Check the stale subset of asins concurrently; returns a count per status"""
+        pending = self.stale(asins)
+        counts = {"checked": 0, "skipped": len(set(asins)) - len(pending)}
+        if not pending:
+            return counts
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for result in pool.map(self.check, pending):
+                results.append(result + (time.time(),))
+                counts[result[1]] = counts.get(result[1], 0) + 1
+                counts["checked"] += 1
+                if shutdown_event is not None and shutdown_event.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+        
+        with self.lock, self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO asin_status (asin, status, http_status, final_asin, checked_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, results)
+        self.unavailable_asins = self._load_unavailable()
+        return counts
+
+def build_seo_prompt(product):
+    """Single-item Gemini prompt for a product review"""
+    return f"""Create a compelling Amazon affiliate product review for: {product.title} (Price: {product.price}, Rating: {product.rating}/5, {product.reviews} reviews).
+
+{SEO_INSTRUCTIONS}
+
+Return ONLY valid JSON in this exact format:
+{{"title": "Review title here", "meta_description": "Description here", "content": "Full HTML content here"}}
+
+No extra text, no code blocks, no markdown - just pure JSON."""
+
+# Product facts published inside marked spans, so posts can be patched in place
+FACT_SPAN_PATTERN = re.compile(r'<span data-fact="(price|rating|reviews)">([^<]*)</span>')
+
+def product_facts(product):
+    """The patchable facts of a product, formatted as they appear in posts"""
+    return {"price": product.price, "rating": str(product.rating), "reviews": f"{product.reviews:,}"}
+
+def fact_span(name, value):
+    return f'<span data-fact="{name}">{html.escape(str(value))}</span>'
+
+def facts_json(facts):
+    """Canonical snapshot of a facts dict, compared as a string"""
+    return json.dumps(facts, sort_keys=True) if facts else None
+
+def extract_facts(content):
+    """Facts found in a post's marked spans, or None for posts without them"""
+    facts = {name: html.unescape(value) for name, value in FACT_SPAN_PATTERN.findall(content or '')}
+    return facts or None
+
+def patch_fact_spans(content, facts):
+    """Rewrite marked spans to the given facts; returns (content, names that changed)"""
+    changed = set()
+    
+    def replace(match):
+        name, value = match.groups()
+        if name in facts and html.unescape(value) != facts[name]:
+            changed.add(name)
+            return fact_span(name, facts[name])
+        return match.group(0)
+    
+    return FACT_SPAN_PATTERN.sub(replace, content), changed
+
+def load_product_facts(path):
+    """Read current product facts from JSON lines of {asin, price, rating, reviews}"""
+    facts_by_asin = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            reviews = row['reviews']
+            facts_by_asin[row['asin']] = {
+                "price": row['price'] if isinstance(row['price'], str) else f"${row['price']:.2f}",
+                "rating": str(row['rating']),
+                "reviews": f"{reviews:,}" if isinstance(reviews, int) else str(reviews)
+            }
+    return facts_by_asin
+
+def render_fallback_content(product, ai_content=""):
+    """Render the template review article for a product, optionally embedding cleaned AI text"""
+    title = f"🔥 {product.title} Review 2024 - Worth the Investment?"
+    
+    # Clean AI content if provided
+    clean_ai_content = ""
+    if ai_content:
+        # Remove potential JSON artifacts, keep inline markup only and cap on a word boundary
+        clean_ai_content = sanitize_html(ai_content.translate(JSON_ARTIFACTS), INLINE_TAGS, max_length=500)
+    
+    # Facts the post updater can patch later
+    price_html = fact_span('price', product.price)
+    rating_html = fact_span('rating', product.rating)
+    reviews_html = fact_span('reviews', f"{product.reviews:,}")
+    
+    content = f"""
+    <div class="product-review">
+        <div class="product-header" style="text-align: center; margin-bottom: 30px;">
+            <img src="{product.image}" alt="{product.title}" style="max-width: 400px; width: 100%; height: auto; border-radius: 10px; box-shadow: 0 8px 25px rgba(0,0,0,0.15); margin-bottom: 20px;">
+            <h2 style="color: #2c3e50; margin-bottom: 10px;">🎯 Why {product.title} is a Top Choice in 2024</h2>
+        </div>
+        
+        <p>Looking for a reliable <strong>{product.title.lower()}</strong>? You're in the right place! After thorough research and analysis of {reviews_html} customer reviews, we're excited to share our comprehensive evaluation of this highly-rated product.</p>
+        
+        <div class="product-highlight" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 25px; border-radius: 15px; margin: 25px 0; text-align: center;">
+            <h3 style="color: white; margin-bottom: 15px;">⭐ Customer Favorite</h3>
+            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-top: 20px;">
+                <div><strong>Rating:</strong> {rating_html}/5 ⭐</div>
+                <div><strong>Reviews:</strong> {reviews_html} verified</div>
+                <div><strong>Price:</strong> {price_html}</div>
+            </div>
+        </div>
+        
+        <h3>✨ Outstanding Features</h3>
+        <ul style="background: #f8f9fa; padding: 20px; border-radius: 10px;">
+            {chr(10).join(f'<li><strong>{feature}</strong></li>' for feature in product.features)}
+        </ul>
+        
+        <h3>📊 What Makes This Product Special</h3>
+        <p>With an impressive <strong>{rating_html}/5 star rating</strong> from over {reviews_html} verified customers, this product has consistently proven its value. Customers frequently mention its exceptional quality, reliability, and outstanding performance.</p>
+        
+        <div class="analysis-grid" style="display: grid; grid-template-columns: 1fr 1fr; gap: 25px; margin: 30px 0;">
+            <div class="pros-section" style="background: #d4edda; padding: 20px; border-radius: 10px; border-left: 4px solid #28a745;">
+                <h4 style="color: #155724; margin-bottom: 15px;">✅ Major Advantages</h4>
+                <ul style="color: #155724;">
+                    <li>Superior build quality and durability</li>
+                    <li>Exceptional value for the price point</li>
+                    <li>Amazon Prime fast shipping available</li>
+                    <li>Overwhelmingly positive customer reviews</li>
+                    <li>Reliable performance and functionality</li>
+                </ul>
+            </div>
+            <div class="considerations" style="background: #f8d7da; padding: 20px; border-radius: 10px; border-left: 4px solid #dc3545;">
+                <h4 style="color: #721c24; margin-bottom: 15px;">⚠️ Things to Consider</h4>
+                <ul style="color: #721c24;">
+                    <li>Check size/compatibility requirements</li>
+                    <li>Compare with similar products if needed</li>
+                    <li>Read product specifications carefully</li>
+                    <li>Consider your specific use case</li>
+                </ul>
+            </div>
+        </div>
+        
+        <h3>💬 Real Customer Feedback</h3>
+        <p>The {reviews_html} customer reviews paint a clear picture: this is a product that delivers on its promises. Customers consistently praise its performance, quality, and value, making it a standout choice in its category.</p>
+        
+        {f'<div class="ai-generated-content" style="margin: 20px 0; padding: 15px; background: #f8f9fa; border-radius: 10px;"><p>{clean_ai_content}</p></div>' if clean_ai_content else ''}
+        
+        <h3>🎯 Our Recommendation</h3>
+        <p>Based on extensive analysis and customer feedback, <strong>{product.title}</strong> offers exceptional value at {price_html}. With its {rating_html}/5 star rating and {reviews_html} satisfied customers, it's a reliable choice you can trust.</p>
+        
+        <div class="urgency-section" style="background: linear-gradient(45deg, #ff6b6b, #ee5a24); color: white; padding: 25px; border-radius: 15px; text-align: center; margin: 30px 0;">
+            <h3 style="color: white; margin-bottom: 15px;">⚡ Don't Wait - Popular Item!</h3>
+            <p style="font-size: 16px; margin-bottom: 20px;">Join thousands of satisfied customers who made the smart choice</p>
+            <div style="font-size: 14px; opacity: 0.9;">
+                ✅ Fast & Free Shipping • ✅ Easy Returns • ✅ Secure Checkout
+            </div>
+        </div>
+    </div>
+    """
+    
+    meta_description = f"{product.title} review: {product.rating}/5 stars from {product.reviews:,} customers. Features, pros/cons & best price at {product.price}."
+    
+    return {
+        "title": title,
+        "meta_description": meta_description,
+        "content": content
+    }
+
+def render_post_html(title, content, affiliate_link, asin=None, facts=None):
+    """Wrap article content with the affiliate call-to-action, trust signals and JSON-LD"""
+    facts_line = ""
+    if facts:
+        facts_line = (f'<p class="product-facts" style="font-size: 16px; margin-bottom: 20px;">'
+                      f'{fact_span("price", facts["price"])} • {fact_span("rating", facts["rating"])}/5 ⭐ • '
+                      f'{fact_span("reviews", facts["reviews"])} reviews</p>')
+    # Escape quotes for the JSON-LD block (kept out of the f-string
+    # because backslashes in f-string expressions need Python 3.12+)
+    escaped_title = title.replace('"', '\\"')
+    
+    # Create complete blog post with affiliate integration
+    formatted_content = f"""
+    <div class="affiliate-product-review"{f' data-asin="{asin}"' if asin else ''} style="max-width: 800px; margin: 0 auto; font-family: Arial, sans-serif;">
+        {content}
+        
+        <div class="cta-section" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 20px; text-align: center; margin: 40px 0; box-shadow: 0 15px 35px rgba(0,0,0,0.1);">
+            <h3 style="color: white; margin-bottom: 20px; font-size: 28px; font-weight: bold;">🎯 Ready to Get Yours?</h3>
+            <p style="font-size: 18px; margin-bottom: 25px; opacity: 0.95;">Click below for the best price and fast delivery!</p>
+            {facts_line}
+            
+            <a href="{affiliate_link}" target="_blank" rel="nofollow sponsored" style="background: white; color: #667eea; padding: 20px 50px; text-decoration: none; border-radius: 50px; font-weight: bold; font-size: 20px; display: inline-block; transition: all 0.3s; box-shadow: 0 8px 25px rgba(0,0,0,0.2); text-transform: uppercase; letter-spacing: 1px;">
+                🛒 Check Price on Amazon →
+            </a>
+            
+            <div style="margin-top: 25px; font-size: 13px; opacity: 0.85; line-height: 1.4;">
+                <p>✅ Prime Shipping Available | ✅ 30-Day Returns | ✅ Secure Payment</p>
+                <p style="margin-top: 15px; font-size: 11px; opacity: 0.7;">*As Amazon Associates, we earn from qualifying purchases. Prices subject to change.</p>
+            </div>
+        </div>
+        
+        <div class="trust-signals" style="background: #f8f9fa; padding: 25px; border-radius: 15px; margin: 30px 0; border: 1px solid #e9ecef;">
+            <h4 style="text-align: center; color: #495057; margin-bottom: 20px;">🏆 Why Choose This Product?</h4>
+            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; text-align: center;">
+                <div>
+                    <div style="font-size: 24px; margin-bottom: 10px;">⭐</div>
+                    <strong>Top Rated</strong><br>
+                    <small>Thousands of 5-star reviews</small>
+                </div>
+                <div>
+                    <div style="font-size: 24px; margin-bottom: 10px;">🚚</div>
+                    <strong>Fast Shipping</strong><br>
+                    <small>Amazon Prime eligible</small>
+                </div>
+                <div>
+                    <div style="font-size: 24px; margin-bottom: 10px;">🔒</div>
+                    <strong>Secure Purchase</strong><br>
+                    <small>Amazon buyer protection</small>
+                </div>
+            </div>
+        </div>
+    </div>
+    
+    <script type="application/ld+json">
+    {{
+        "@context": "https://schema.org/",
+        "@type": "Review",
+        "itemReviewed": {{
+            "@type": "Product",
+            "name": "{escaped_title}"
+        }},
+        "reviewRating": {{
+            "@type": "Rating",
+            "ratingValue": "4.5",
+            "bestRating": "5"
+        }},
+        "author": {{
+            "@type": "Organization",
+            "name": "Fresh Finds Store"
+        }}
+    }}
+    </script>
+    """
+    return formatted_content
+
+# Request fields, headers and query parameters that are never written to cassettes
+SECRET_FIELDS = {'key', 'access_token', 'refresh_token', 'client_secret', 'id_token', 'authorization', 'x-goog-api-key'}
+ASIN_PATTERN = re.compile(r'\b[A-Z0-9]{10}\b')
+
+def redact(value, secrets=()):
+    """Recursively replace secret fields and known secret values with 'REDACTED'"""
+    if isinstance(value, dict):
+        return {k: 'REDACTED' if str(k).lower() in SECRET_FIELDS else redact(v, secrets) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, secrets) for v in value]
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, 'REDACTED')
+        return value
+    return value
+
+def redact_url(url, secrets=()):
+    """Redact secret query parameters from a URL"""
+    parsed = urlparse(url)
+    query = '&'.join(
+        f"{name}=REDACTED" if name.lower() in SECRET_FIELDS else f"{name}={val}"
+        for name, _, val in (part.partition('=') for part in parsed.query.split('&') if part)
+    )
+    return redact(parsed._replace(query=query).geturl(), secrets)
+
+def cassette_key(method, url):
+    """Match key for replay: method, host and path with ASINs and query stripped"""
+    parsed = urlparse(url)
+    return f"{method.upper()} {parsed.netloc}{ASIN_PATTERN.sub('{asin}', parsed.path)}"
+
+class RecordingSession(requests.Session):
+    """requests.Session that appends every exchange, redacted and timed, to a JSONL cassette"""
+
+    def __init__(self, cassette_path, secrets=(), metadata=None):
+        super().__init__()
+        self.secrets = [secret for secret in secrets if secret]
+        self.lock = Lock()
+        self.handle = open(cassette_path, 'a', encoding='utf-8')
+        self._write({"event": "start", "recorded_at": time.time(), **(metadata or {})})
+
+    def _write(self, entry):
+        with self.lock:
+            self.handle.write(json.dumps(entry) + '\n')
+            self.handle.flush()
+
+    def _decode_body(self, text):
+        try:
+            return redact(json.loads(text), self.secrets)
+        except ValueError:
+            return redact(text, self.secrets)
+
+    def request(self, method, url, **kwargs):
+        entry = {
+            "event": "http",
+            "method": method.upper(),
+            "url": redact_url(url, self.secrets),
+            "key": cassette_key(method, url),
+            "request": redact({k: kwargs.get(k) for k in ('json', 'data', 'headers') if kwargs.get(k)}, self.secrets)
+        }
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            entry.update(elapsed=time.perf_counter() - started, error=type(e).__name__, message=redact(str(e), self.secrets))
+            self._write(entry)
+            raise
+        entry.update(elapsed=time.perf_counter() - started, response={
+            "status": response.status_code,
+            "headers": redact(dict(response.headers), self.secrets),
+            "body": self._decode_body(response.text)
+        })
+        self._write(entry)
+        return response
+
+    def mark_cycle(self, duration, success):
+        """Record the wall time of a posting cycle so replays can be compared to it"""
+        self._write({"event": "cycle", "duration": duration, "success": success})
+
+class ReplaySession(requests.Session):
+    """requests.Session that serves responses from a cassette instead of the network.
+    
+    Exchanges are matched by cassette_key in recorded order, and each one waits
+    for its recorded latency multiplied by latency_scale (0 = as fast as possible).
+    """
+
+    def __init__(self, cassette_path, latency_scale=1.0):
+        super().__init__()
+        self.latency_scale = latency_scale
+        self.lock = Lock()
+        self.metadata = {}
+        self.queues = {}
+        self.recorded_cycles = []
+        with open(cassette_path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["event"] == "start" and not self.metadata:
+                    self.metadata = entry
+                elif entry["event"] == "http":
+                    self.queues.setdefault(entry["key"], []).append(entry)
+                elif entry["event"] == "cycle":
+                    self.recorded_cycles.append(entry)
+        self.served = 0
+
+    def request(self, method, url, **kwargs):
+        key = cassette_key(method, url)
+        with self.lock:
+            queue = self.queues.get(key)
+            entry = queue.pop(0) if queue else None
+            self.served += entry is not None
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response left for {key}")
+        
+        if self.latency_scale:
+            time.sleep(entry["elapsed"] * self.latency_scale)
+        if "error" in entry:
+            raise getattr(requests.exceptions, entry["error"], requests.exceptions.RequestException)(entry["message"])
+        
+        recorded = entry["response"]
+        body = recorded["body"]
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response._content = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+        response.headers = requests.structures.CaseInsensitiveDict(recorded["headers"])
+        response.headers.pop('Content-Encoding', None)
+        response.encoding = 'utf-8'
+        response.url = url
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+def parse_rfc3339(value):
+    """Blogger timestamp (e.g. 2024-05-01T10:00:00-07:00) to epoch seconds; None if absent"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def extract_asin(html):
+    """Find the ASIN a post was written for in its HTML"""
+    match = (re.search(r'data-asin="([A-Z0-9]{10})"', html or '')
+             or re.search(r'amazon\.com/dp/([A-Z0-9]{10})', html or '')
+             or re.search(r'images/I/([A-Z0-9]{10})\.', html or ''))
+    return match.group(1) if match else None
+
+class PostArchive:
+    """Local SQLite archive of published posts, kept in sync with Blogger.
+    
+    The latest publish time per ASIN is also held in memory so dedup checks
+    on the posting path don't touch the database.
+    """
+
+    def __init__(self, path):
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    post_id TEXT PRIMARY KEY,
+                    url TEXT,
+                    asin TEXT,
+                    title TEXT,
+                    labels TEXT,
+                    published REAL,
+                    updated REAL,
+                    synced_at REAL NOT NULL,
+                    facts TEXT
+                );
+                CREATE INDEX IF NOT EXISTS posts_asin ON posts (asin, published);
+                CREATE INDEX IF NOT EXISTS posts_updated ON posts (updated);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+            # Archives created before facts were tracked
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(posts)")}
+            if "facts" not in columns:
+                self.conn.execute("ALTER TABLE posts ADD COLUMN facts TEXT")
+            rows = self.conn.execute(
+                "SELECT asin, MAX(published) FROM posts WHERE asin IS NOT NULL GROUP BY asin").fetchall()
+        self.latest_by_asin = dict(rows)
+
+    def upsert(self, posts):
+        """Insert or refresh Blogger post resources (dicts as returned by the API)"""
+        now = time.time()
+        rows = []
+        for post in posts:
+            asin = post.get('asin') or extract_asin(post.get('content'))
+            published = parse_rfc3339(post.get('published')) or now
+            # Facts as published: read back from the body when the sync fetched one
+            facts = facts_json(extract_facts(post.get('content')) or post.get('facts'))
+            rows.append((post['id'], post.get('url'), asin, post.get('title'), json.dumps(post.get('labels', [])),
+                         published, parse_rfc3339(post.get('updated')) or published, now, facts))
+        with self.lock, self.conn:
+            # Keep a known ASIN if a later sync of the same post can't find one
+            self.conn.executemany("""
+                INSERT INTO posts (post_id, url, asin, title, labels, published, updated, synced_at, facts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (post_id) DO UPDATE SET
+                    url = excluded.url, asin = COALESCE(excluded.asin, posts.asin), title = excluded.title,
+                    labels = excluded.labels, published = excluded.published, updated = excluded.updated,
+                    synced_at = excluded.synced_at, facts = COALESCE(excluded.facts, posts.facts)
+            """, rows)
+        for _, _, asin, _, _, published, _, _, _ in rows:
+            if asin and published > self.latest_by_asin.get(asin, 0):
+                self.latest_by_asin[asin] = published
+
+    def get_state(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def posted_since(self, asin, since):
+        """True if the ASIN was published at or after the given epoch time"""
+        return self.latest_by_asin.get(asin, 0) >= since
+
+    def find_by_asin(self, asin):
+        """All archived posts for an ASIN, newest first"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT post_id, url, asin, title, labels, published FROM posts WHERE asin = ? ORDER BY published DESC
+            """, (asin,)).fetchall()
+        return [PostRecord(r[0], r[1], r[2], r[3], tuple(json.loads(r[4] or '[]')), r[5]) for r in rows]
+
+    def recent(self, limit=20):
+        """Most recently published posts"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT post_id, url, asin, title, labels, published FROM posts ORDER BY published DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [PostRecord(r[0], r[1], r[2], r[3], tuple(json.loads(r[4] or '[]')), r[5]) for r in rows]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def fact_snapshots(self, page_size=1000):
+        """Yield (post_id, asin, facts JSON) for every Blogger post with an ASIN, in pages"""
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute("""
+                    SELECT rowid, post_id, asin, facts FROM posts
+                    WHERE rowid > ? AND asin IS NOT NULL AND post_id NOT LIKE 'static:%'
+                    ORDER BY rowid LIMIT ?
+                """, (last_rowid, page_size)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, post_id, asin, facts in rows:
+                yield post_id, asin, facts
+
+    def set_facts(self, post_id, facts):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE posts SET facts = ? WHERE post_id = ?", (facts_json(facts), post_id))
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc; peak RSS elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class MemoryMonitor:
+    """Opt-in memory diagnostics: tracemalloc top allocators plus an RSS history"""
+
+    def __init__(self, interval=60, history=1440, frames=1):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def sample(self):
+        traced, peak = tracemalloc.get_traced_memory()
+        self.samples.append({
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "rss_mb": round(current_rss_bytes() / 2**20, 2),
+            "traced_mb": round(traced / 2**20, 2),
+            "traced_peak_mb": round(peak / 2**20, 2)
+        })
+
+    def run(self, shutdown_event):
+        while not shutdown_event.is_set():
+            self.sample()
+            shutdown_event.wait(self.interval)
+
+    def report(self, limit=20):
+        stats = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        )).statistics('lineno')
+        return {
+            "rss_mb": round(current_rss_bytes() / 2**20, 2),
+            "top_allocators": [
+                {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in stats[:limit]
+            ],
+            "history": list(self.samples)
+        }
+
+def parse_bitly_time(value):
+    """Bitly timestamp (e.g. 2024-05-01T10:00:00+0000) to epoch seconds"""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+
+def bitlink_id(link):
+    """Bitly's id for a link: the short URL without its scheme"""
+    return re.sub(r'^https?://', '', link or '')
+
+class ClickAnalytics:
+    """Local store of Bitly links and their daily click counts.
+    
+    Clicks are kept per link per UTC day so re-fetching a day replaces rather
+    than double-counts it. Aggregates turn them into relative click-through
+    rates per ASIN and per category for the product scorer.
+    """
+
+    def __init__(self, path):
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS links (
+                    link TEXT PRIMARY KEY,
+                    long_url TEXT,
+                    asin TEXT,
+                    category TEXT,
+                    created_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS links_asin ON links (asin);
+                CREATE TABLE IF NOT EXISTS daily_clicks (
+                    link TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    clicks INTEGER NOT NULL,
+                    PRIMARY KEY (link, day)
+                );
+                CREATE INDEX IF NOT EXISTS daily_clicks_day ON daily_clicks (day);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    def get_state(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def register_links(self, links):
+        """Upsert (link, long_url, asin, category, created_at) rows, keeping known categories"""
+        with self.lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO links (link, long_url, asin, category, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (link) DO UPDATE SET
+                    long_url = excluded.long_url,
+                    asin = COALESCE(excluded.asin, links.asin),
+                    category = COALESCE(excluded.category, links.category),
+                    created_at = COALESCE(links.created_at, excluded.created_at)
+            """, [(bitlink_id(link),) + tuple(rest) for link, *rest in links])
+
+    def known_links(self, created_before=None, after=''):
+        """Link ids in id order, optionally only those created by a time and sorting after a cursor"""
+        with self.lock:
+            return [link for (link,) in self.conn.execute(
+                "SELECT link FROM links WHERE COALESCE(created_at, 0) <= ? AND link > ? ORDER BY link",
+                (float('inf') if created_before is None else created_before, after))]
+
+    def store_day(self, day, clicks_by_link, replace=True):
+        """Record click counts for one UTC day, replacing what was stored unless replace is False"""
+        with self.lock, self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM daily_clicks WHERE day = ?", (day,))
+            self.conn.executemany("INSERT OR REPLACE INTO daily_clicks (link, day, clicks) VALUES (?, ?, ?)",
+                                  [(bitlink_id(link), day, clicks) for link, clicks in clicks_by_link.items() if clicks])
+
+    def click_through_rates(self, since_day, prior):
+        """Relative CTR per ASIN and per category: clicks per link scaled so the average is `prior`"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT l.asin, l.category, COUNT(*), COALESCE(SUM(c.total), 0)
+                FROM links l
+                LEFT JOIN (SELECT link, SUM(clicks) AS total FROM daily_clicks WHERE day >= ? GROUP BY link) c
+                    ON c.link = l.link
+                WHERE l.asin IS NOT NULL
+                GROUP BY l.asin, l.category
+            """, (since_day,)).fetchall()
+        total_links = sum(r[2] for r in rows)
+        total_clicks = sum(r[3] for r in rows)
+        if not total_links or not total_clicks:
+            return {}, {}
+        mean_rate = total_clicks / total_links
+        
+        by_asin, by_category = {}, {}
+        for asin, category, links, clicks in rows:
+            a = by_asin.setdefault(asin, [0, 0])
+            a[0] += links
+            a[1] += clicks
+            if category:
+                c = by_category.setdefault(category, [0, 0])
+                c[0] += links
+                c[1] += clicks
+        scale = lambda pair: prior * (pair[1] / pair[0]) / mean_rate
+        return ({asin: scale(pair) for asin, pair in by_asin.items()},
+                {category: scale(pair) for category, pair in by_category.items()})
+
+class Coordinator:
+    """Leases and publish dedup shared by bot instances through one SQLite file.
+    
+    Every lease (the 'leader' lease for singleton jobs, 'asin:<ASIN>' work
+    claims) lasts lease_ttl seconds and is renewed by its holder's heartbeat,
+    so the leases of an instance that dies run out within lease_ttl. Claims
+    and the published table are checked and written in one IMMEDIATE
+    transaction, which makes claiming atomic across processes.
+    """
+
+    def __init__(self, path, instance_id=None, lease_ttl=30):
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}-{os.urandom(3).hex()}"
+        self.lease_ttl = lease_ttl
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # Commits survive a crashed process without an fsync each; only
+            # a power cut can lose the last few, which leases then cover again
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS instances (
+                    instance_id TEXT PRIMARY KEY,
+                    started_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS leases_holder ON leases (holder);
+                CREATE TABLE IF NOT EXISTS published (
+                    asin TEXT PRIMARY KEY,
+                    post_id TEXT,
+                    instance_id TEXT NOT NULL,
+                    published_at REAL NOT NULL
+                );
+            """)
+        self.heartbeat()
+
+    def _transaction(self, work):
+        """Run work(now) inside BEGIN IMMEDIATE, so check-then-write is atomic"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(time.time())
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def heartbeat(self):
+        """Mark this instance alive and extend every lease it holds"""
+        def work(now):
+            self.conn.execute("""
+                INSERT INTO instances (instance_id, started_at, heartbeat_at) VALUES (?, ?, ?)
+                ON CONFLICT (instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            """, (self.instance_id, now, now))
+            self.conn.execute("UPDATE leases SET expires_at = ? WHERE holder = ? AND expires_at > ?",
+                              (now + self.lease_ttl, self.instance_id, now))
+        self._transaction(work)
+
+    def _take(self, name, now):
+        row = self.conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        if row and row[0] != self.instance_id and row[1] > now:
+            return False
+        self.conn.execute("INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                          (name, self.instance_id, now + self.lease_ttl))
+        return True
+
+    def acquire(self, name):
+        """Take or keep a lease; False while another live instance holds it"""
+        return self._transaction(lambda now: self._take(name, now))
+
+    def release(self, name):
+        self._transaction(lambda now: self.conn.execute(
+            "DELETE FROM leases WHERE name = ? AND holder = ?", (name, self.instance_id)))
+
+    def release_claims(self):
+        """Drop this instance's unfinished product claims"""
+        self._transaction(lambda now: self.conn.execute(
+            "DELETE FROM leases WHERE holder = ? AND name LIKE 'asin:%'", (self.instance_id,)))
+
+    def is_leader(self):
+        return self.acquire("leader")
+
+    def claim_product(self, asin, cooldown):
+        """Claim an ASIN for this instance unless it is claimed elsewhere or was published within cooldown"""
+        def work(now):
+            row = self.conn.execute("SELECT published_at FROM published WHERE asin = ?", (asin,)).fetchone()
+            if row and row[0] >= now - cooldown:
+                return False
+            return self._take(f"asin:{asin}", now)
+        return self._transaction(work)
+
+    def record_published(self, asin, post_id=None):
+        """Record a publish for every instance to see, and drop the claim"""
+        def work(now):
+            self.conn.execute("INSERT OR REPLACE INTO published (asin, post_id, instance_id, published_at) VALUES (?, ?, ?, ?)",
+                              (asin, post_id, self.instance_id, now))
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (f"asin:{asin}", self.instance_id))
+        self._transaction(work)
+
+    def published_since(self, since):
+        """ASINs any instance published at or after `since`"""
+        with self.lock:
+            rows = self.conn.execute("SELECT asin FROM published WHERE published_at >= ?", (since,)).fetchall()
+        return {asin for (asin,) in rows}
+
+    def alive_instances(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT instance_id FROM instances WHERE heartbeat_at > ? ORDER BY started_at",
+                                     (time.time() - self.lease_ttl,)).fetchall()
+        return [instance_id for (instance_id,) in rows]
+
+    def run(self, shutdown_event):
+        """Heartbeat every third of the lease TTL until shutdown, then hand everything back"""
+        while not shutdown_event.wait(self.lease_ttl / 3):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Coordination heartbeat failed: {e}")
+        self.close()
+
+    def close(self):
+        """Release all leases so other instances don't wait for them to expire"""
+        def work(now):
+            self.conn.execute("DELETE FROM leases WHERE holder = ?", (self.instance_id,))
+            self.conn.execute("DELETE FROM instances WHERE instance_id = ?", (self.instance_id,))
+        self._transaction(work)
+
+class ConfigError(ValueError):
+    """Raised when the bot config file is missing fields, mistyped or inconsistent"""
+
+def _positive(value):
+    return value > 0
+
+def _non_negative(value):
+    return value >= 0
+
+def _string_list(value):
+    return bool(value) and all(isinstance(item, str) and item for item in value)
+
+def _asin_map(value):
+    return bool(value) and all(
+        isinstance(asins, list) and asins and all(isinstance(asin, str) and ASIN_PATTERN.fullmatch(asin) for asin in asins)
+        for asins in value.values())
+
+# Reloadable settings: key -> (accepted types, check, bot attribute)
+BOT_CONFIG_FIELDS = {
+    "blogger_id": (str, str.isdigit, "blogger_id"),
+    "blogger_url": (str, lambda v: v.startswith(("http://", "https://")), "blogger_url"),
+    "amazon_tag": (str, bool, "amazon_tag"),
+    "trending_categories": (list, _string_list, "trending_categories"),
+    "high_intent_keywords": (list, _string_list, "high_intent_keywords"),
+    "asins_by_category": (dict, _asin_map, "real_asins_by_category"),
+    "max_retries": (int, _positive, "max_retries"),
+    "retry_delay": ((int, float), _non_negative, "retry_delay"),
+    "post_interval": ((int, float), lambda v: v >= 60, "post_interval"),
+    "products_per_cycle": (int, _positive, "products_per_cycle"),
+    "gemini_batch_size": (int, _positive, "gemini_batch_size"),
+    "cycle_budget": ((int, float), _positive, "cycle_budget"),
+    "post_reserve": ((int, float), _non_negative, "post_reserve"),
+    "repost_cooldown": ((int, float), _non_negative, "repost_cooldown"),
+    "asin_validation_interval": ((int, float), _positive, "asin_validation_interval"),
+    "click_sync_interval": ((int, float), _positive, "click_sync_interval"),
+    "asin_validator_concurrency": (int, _positive, "asin_validator_concurrency"),
+    "asin_validator_per_host": (int, _positive, "asin_validator_per_host"),
+    "http_pool_size": (int, _positive, "http_pool_size"),
+}
+
+def load_bot_config(path):
+    """Read and validate a JSON config file; only the keys present are returned"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ConfigError(f"cannot read {path}: {e}") from e
+    if not isinstance(config, dict):
+        raise ConfigError(f"{path}: top level must be an object")
+    
+    unknown = sorted(set(config) - set(BOT_CONFIG_FIELDS))
+    if unknown:
+        raise ConfigError(f"{path}: unknown setting(s) {', '.join(unknown)}")
+    for key, value in config.items():
+        types, check, _ = BOT_CONFIG_FIELDS[key]
+        # bool is an int subclass, but "max_retries": true is a typo, not a number
+        if isinstance(value, bool) or not isinstance(value, types) or not check(value):
+            raise ConfigError(f"{path}: invalid value for {key}: {value!r}")
+    return config
+
+def check_bot_settings(settings):
+    """Cross-field checks on the full set of settings a config would leave the bot with"""
+    if settings["post_reserve"] >= settings["cycle_budget"]:
+        raise ConfigError("post_reserve must be smaller than cycle_budget")
+    missing = [c for c in settings["trending_categories"] if not settings["asins_by_category"].get(c)]
+    if missing:
+        raise ConfigError(f"no ASINs for categor(ies) {', '.join(missing)}")
+
+class Publisher(ABC):
+    """Publishing backend interface - Blogger today, anything with publish() tomorrow"""
+
+    name = "base"
+
+    def check_ready(self):
+        """Verify credentials/targets before the scheduler starts; False stops the bot"""
+        return True
+
+    def sync(self, deadline=None):
+        """Refresh any local view of what has been published (called each cycle)"""
+
+    @abstractmethod
+    def publish(self, title, content, meta_description, affiliate_link, product, deadline=None):
+        """Publish one article; returns True on success"""
+
+class BloggerPublisher(Publisher):
+    """Publishes through the Blogger REST API using the bot's OAuth handling"""
+
+    name = "blogger"
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def check_ready(self):
+        bot = self.bot
+        # Run diagnostics
+        bot.diagnose_authentication()
+        
+        if not bot.refresh_token:
+            logger.error("❌ GOOGLE_OAUTH_TOKEN environment variable not set!")
+            logger.error("Please set your token in Render environment variables")
+            logger.error("The bot will continue but posting will fail without proper authentication")
+            return False
+        
+        # A token restored from a snapshot that Blogger accepted recently
+        # doesn't need another round trip
+        if bot.restored_state and bot.access_token and time.time() - bot.blogger_verified_at < 3600:
+            logger.info("✅ Restored token was verified recently - ready to post!")
+            return True
+        
+        # Test Blogger access
+        logger.info("🧪 Testing Blogger API access...")
+        if bot.test_blogger_access():
+            logger.info("✅ Authentication working correctly - ready to post!")
+        else:
+            logger.error("❌ Authentication test failed - please check your token")
+            if bot.token_type == 'access':
+                logger.error("💡 Tip: Make sure you're using an ACCESS TOKEN starting with 'ya29.'")
+                logger.error("💡 Access tokens expire - you may need a fresh one")
+            elif bot.token_type == 'refresh':
+                logger.error("💡 Tip: Check your GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET")
+                logger.error("💡 Refresh tokens require proper client credentials")
+            return False
+        return True
+
+    def sync(self, deadline=None):
+        self.bot.sync_post_archive(deadline=deadline)
+
+    def publish(self, title, content, meta_description, affiliate_link, product, deadline=None):
+        return self.bot.post_to_blogger(title, content, meta_description, affiliate_link, product.asin,
+                                        deadline=deadline, facts=product_facts(product))
+
+def slugify(text, limit=60):
+    """URL-safe lowercase slug"""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:limit].rstrip('-') or 'post'
+
+def write_file_atomic(path, text, mode=None):
+    """Write via a temp file and rename so readers never see a half-written file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Unique per thread so concurrent writers never share a temp file
+    temp_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class StaticSitePublisher(Publisher):
+    """Writes posts, paginated category indexes and a sharded sitemap to a local directory.
+    
+    Rebuilds are incremental: a new or changed post rewrites its own page, the
+    one category page and sitemap shard it belongs to, and the small top-level
+    indexes. Category pages hold posts in publish order (page_size each) and
+    sitemap shards hold sitemap_shard_size URLs, so earlier pages are never
+    touched again when new posts arrive.
+    """
+
+    name = "static"
+
+    def __init__(self, root, site_url, archive=None, page_size=100, sitemap_shard_size=1000):
+        self.root = root
+        self.site_url = site_url.rstrip('/')
+        self.archive = archive
+        self.page_size = page_size
+        self.sitemap_shard_size = sitemap_shard_size
+        os.makedirs(root, exist_ok=True)
+        self.lock = Lock()
+        self.conn = sqlite3.connect(os.path.join(root, '.manifest.sqlite3'), check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    slug TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL UNIQUE,
+                    category TEXT NOT NULL,
+                    category_seq INTEGER NOT NULL,
+                    asin TEXT,
+                    title TEXT NOT NULL,
+                    meta_description TEXT,
+                    content_hash TEXT NOT NULL,
+                    published REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_category ON pages (category, category_seq);
+            """)
+
+    def _url(self, relative_path):
+        return f"{self.site_url}/{relative_path}"
+
+    @staticmethod
+    def _document(title, body, description=""):
+        return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<meta name="description" content="{html.escape(description)}">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+    def _write_category_page(self, category, page):
+        first = page * self.page_size
+        rows = self.conn.execute("""
+            SELECT slug, title, published FROM pages
+            WHERE category = ? AND category_seq >= ? AND category_seq < ? ORDER BY category_seq
+        """, (category, first, first + self.page_size)).fetchall()
+        items = '\n'.join(f'<li><a href="../../posts/{slug}.html">{html.escape(title)}</a></li>' for slug, title, _ in rows)
+        name = category.replace('-', ' ').title()
+        nav = f'<p><a href="page-{page}.html">&larr; Older</a></p>' if page else ''
+        write_file_atomic(os.path.join(self.root, 'category', category, f'page-{page + 1}.html'),
+                          self._document(f"{name} reviews - page {page + 1}", f"<h1>{html.escape(name)}</h1>\n<ul>\n{items}\n</ul>\n{nav}"))
+
+    def _write_category_index(self, category, total):
+        pages = (total + self.page_size - 1) // self.page_size
+        links = '\n'.join(f'<li><a href="page-{n}.html">Page {n}</a></li>' for n in range(pages, 0, -1))
+        name = category.replace('-', ' ').title()
+        write_file_atomic(os.path.join(self.root, 'category', category, 'index.html'),
+                          self._document(f"{name} reviews", f"<h1>{html.escape(name)}</h1>\n<p>{total} reviews</p>\n<ul>\n{links}\n</ul>"))
+
+    def _write_site_index(self):
+        rows = self.conn.execute("SELECT category, COUNT(*) FROM pages GROUP BY category ORDER BY category").fetchall()
+        items = '\n'.join(f'<li><a href="category/{category}/index.html">{html.escape(category.replace("-", " ").title())}</a> ({count})</li>'
+                          for category, count in rows)
+        write_file_atomic(os.path.join(self.root, 'index.html'),
+                          self._document("Fresh Finds Store", f"<h1>Fresh Finds Store</h1>\n<ul>\n{items}\n</ul>"))
+
+    def _write_sitemap_shard(self, shard):
+        first = shard * self.sitemap_shard_size
+        rows = self.conn.execute("SELECT slug, updated FROM pages WHERE seq >= ? AND seq < ? ORDER BY seq",
+                                 (first, first + self.sitemap_shard_size)).fetchall()
+        urls = '\n'.join(
+            f"  <url><loc>{self._url(f'posts/{slug}.html')}</loc>"
+            f"<lastmod>{datetime.fromtimestamp(updated, timezone.utc).strftime('%Y-%m-%d')}</lastmod></url>"
+            for slug, updated in rows)
+        write_file_atomic(os.path.join(self.root, 'sitemaps', f'sitemap-{shard + 1}.xml'),
+                          f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{urls}\n</urlset>\n')
+
+    def _write_sitemap_index(self, total):
+        shards = (total + self.sitemap_shard_size - 1) // self.sitemap_shard_size
+        entries = '\n'.join(f"  <sitemap><loc>{self._url(f'sitemaps/sitemap-{n}.xml')}</loc></sitemap>" for n in range(1, shards + 1))
+        write_file_atomic(os.path.join(self.root, 'sitemap.xml'),
+                          f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{entries}\n</sitemapindex>\n')
+
+    def publish(self, title, content, meta_description, affiliate_link, product, deadline=None):
+        slug = f"{slugify(product.title)}-{product.asin.lower()}"
+        facts = product_facts(product)
+        page = self._document(title, render_post_html(title, content, affiliate_link, product.asin, facts), meta_description)
+        content_hash = hashlib.sha256(page.encode()).hexdigest()
+        now = time.time()
+        
+        with self.lock:
+            existing = self.conn.execute("SELECT seq, category, category_seq, title, content_hash FROM pages WHERE slug = ?",
+                                         (slug,)).fetchone()
+            if existing and existing[4] == content_hash:
+                logger.info(f"📄 Static page unchanged, nothing to rebuild: {slug}")
+                return True
+            
+            write_file_atomic(os.path.join(self.root, 'posts', f'{slug}.html'), page)
+            with self.conn:
+                if existing:
+                    seq, category, category_seq, old_title, _ = existing
+                    self.conn.execute("UPDATE pages SET title = ?, meta_description = ?, content_hash = ?, updated = ? WHERE slug = ?",
+                                      (title, meta_description, content_hash, now, slug))
+                else:
+                    category = product.category
+                    seq = self.conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM pages").fetchone()[0]
+                    category_seq = self.conn.execute("SELECT COUNT(*) FROM pages WHERE category = ?", (category,)).fetchone()[0]
+                    self.conn.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (slug, seq, category, category_seq, product.asin, title, meta_description,
+                                       content_hash, now, now))
+                    old_title = None
+            
+            # Only the pages this post appears on are rebuilt
+            rebuilt = 1
+            if title != old_title:
+                self._write_category_page(category, category_seq // self.page_size)
+                rebuilt += 1
+            self._write_sitemap_shard(seq // self.sitemap_shard_size)
+            rebuilt += 1
+            if not existing:
+                # The category index carries the review count, so it changes with every new post
+                self._write_category_index(category, category_seq + 1)
+                self._write_site_index()
+                rebuilt += 1
+                total = seq + 1
+                if seq % self.sitemap_shard_size == 0:
+                    self._write_sitemap_index(total)
+                    rebuilt += 1
+                rebuilt += 1
+        
+        if self.archive is not None:
+            self.archive.upsert([{"id": f"static:{slug}", "url": self._url(f'posts/{slug}.html'), "asin": product.asin,
+                                  "title": title, "labels": [product.category], "facts": facts}])
+        logger.info(f"✅ Published static page {slug} ({rebuilt} file(s) written)")
+        return True
+
 class AmazonAffiliateBlogBot:
     def __init__(self):
         # Your credentials - already integrated
@@ -85,13 +2038,161 @@ class AmazonAffiliateBlogBot:
             "multi-purpose", "heavy-duty", "eco-friendly", "energy efficient"
         ]
         
+        # Real Amazon ASINs for different categories (these are real products)
+        self.real_asins_by_category = {
+            "electronics": ["B08N5WRWNW", "B07FZ8S74R", "B08R6K1Y1K", "B09G91L2YV", "B084JBQZPX"],
+            "home-kitchen": ["B07V34FMJX", "B08567C98J", "B08Q3M88GK", "B08FQPVFLL", "B07P6Y1JXY"],
+            "fashion": ["B07KGCFMZX", "B08NDHZ8L4", "B09334JJQP", "B087CJSB7K", "B08M5QRXZC"],
+            "beauty": ["B07RJMQ2GY", "B08BZ5TYLK", "B07G8N2G3C", "B089H89JT8", "B08F9DGSMR"],
+            "sports-outdoors": ["B07X8Z8W1P", "B08M8TD9RZ", "B086R9D6V2", "B089WXBHX5", "B07S9XHJ2Q"],
+            "automotive": ["B07BFQMFN6", "B084JBQZPX", "B07YTB7D3L", "B08FQMCJKQ", "B089WXPQR4"],
+            "tools-home-improvement": ["B07F7V8Z5R", "B08MZQK7GR", "B07K2Y9QSJ", "B089WXBHX5", "B07RJMQ2GY"],
+            "toys-games": ["B08567C98J", "B08Q3M88GK", "B07X8Z8W1P", "B089H89JT8", "B087CJSB7K"],
+            "health-personal-care": ["B07G8N2G3C", "B08BZ5TYLK", "B08F9DGSMR", "B089H89JT8", "B07RJMQ2GY"],
+            "books": ["B08N5WRWNW", "B07FZ8S74R", "B08R6K1Y1K", "B09G91L2YV", "B084JBQZPX"],
+            "baby-products": ["B07V34FMJX", "B08567C98J", "B08Q3M88GK", "B08FQPVFLL", "B07P6Y1JXY"],
+            "pet-supplies": ["B07KGCFMZX", "B08NDHZ8L4", "B09334JJQP", "B087CJSB7K", "B08M5QRXZC"],
+            "garden-lawn": ["B07X8Z8W1P", "B08M8TD9RZ", "B086R9D6V2", "B089WXBHX5", "B07S9XHJ2Q"],
+            "musical-instruments": ["B07BFQMFN6", "B084JBQZPX", "B07YTB7D3L", "B08FQMCJKQ", "B089WXPQR4"]
+        }
+        
+        # Product scoring engine - picks the top-k candidates every cycle
+        self.scorer = ProductScorer()
+        self.products_per_cycle = 3
+        
+        # Gemini batching - articles generated per request (1 = single-item mode)
+        # plus generated content waiting to be posted in later cycles
+        self.gemini_batch_size = 3
+        self.content_queue = []
+        self.gemini_stats = {
+            mode: {"requests": 0, "articles": 0, "prompt_tokens": 0, "output_tokens": 0, "latency": 0.0}
+            for mode in ("single", "batch")
+        }
+        
+        # Local state (quota ledger etc.) lives under the data directory
+        self.data_dir = os.getenv('BOT_DATA_DIR', 'data')
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Upstream quotas - None means no limit for that window
+        self.quota_limits = {
+            "bitly": {"daily": None, "monthly": 1000},
+            "gemini": {"daily": 1500, "monthly": None}
+        }
+        self.quota_ledger = QuotaLedger(os.path.join(self.data_dir, 'quota.sqlite3'), self.quota_limits)
+        self.bitly_credential = QuotaLedger.credential_id(self.bitly_token)
+        self.gemini_credential = QuotaLedger.credential_id(self.gemini_api_key)
+        self.blogger_credential = QuotaLedger.credential_id(self.blogger_id)
+        
+        # Background ASIN availability checks; selection skips dead/redirected ASINs
+        self.asin_validator_concurrency = 16
+        self.asin_validator_per_host = 4
+        self.asin_validator = self._create_asin_validator()
+        self.asin_validation_interval = 6 * 3600  # seconds
+        
+        # Local archive of everything published, synced incrementally from Blogger
+        self.post_archive = PostArchive(os.path.join(self.data_dir, 'posts.sqlite3'))
+        self.repost_cooldown = 3 * 24 * 3600  # don't post the same ASIN again within 3 days
+        
+        # In-place updates of published prices/ratings/review counts from a
+        # product facts feed (JSON lines, BOT_PRODUCT_FACTS)
+        self.product_facts_path = os.getenv('BOT_PRODUCT_FACTS')
+        self.post_update_interval = 6 * 3600  # seconds
+        self.post_update_rate = 2.0  # Blogger requests per second
+        self.quota_limits["blogger_updates"] = {"daily": 5000, "monthly": None}
+        for asin, published in self.post_archive.latest_by_asin.items():
+            self.scorer.seed_post_time(asin, published)
+        
+        # Opt-in memory diagnostics served on /debug/memory
+        self.memory_monitor = MemoryMonitor() if os.getenv('BOT_MEMORY_DIAGNOSTICS') == '1' else None
+        
+        # Upstream endpoints (overridden by the benchmarks and fault harness)
+        self.bitly_api_base = "https://api-ssl.bitly.com/v4"
+        self.gemini_api_base = "https://generativelanguage.googleapis.com"
+        self.blogger_api_base = "https://www.googleapis.com/blogger/v3"
+        self.oauth_token_url = "https://oauth2.googleapis.com/token"
+        self.amazon_image_base = "https://m.media-amazon.com/images/I"
+        
+        # Bitly click metrics, ingested in the background to weight selection
+        self.click_analytics = ClickAnalytics(os.path.join(self.data_dir, 'clicks.sqlite3'))
+        self.click_sync_interval = 6 * 3600  # seconds
+        self.click_window_days = 30
+        self.quota_limits["bitly_analytics"] = {"daily": 1000, "monthly": None}
+        self.apply_click_through_rates()
+        
+        # Coordination between instances sharing one blog (BOT_COORDINATION_DB):
+        # product claims and publish dedup, plus a leader for singleton jobs
+        coordination_db = os.getenv('BOT_COORDINATION_DB')
+        self.coordinator = Coordinator(coordination_db, os.getenv('BOT_INSTANCE_ID')) if coordination_db else None
+        
+        # Publishing backend: 'blogger' (default) or 'static' (local static site)
+        self.publisher = self._create_publisher(os.getenv('BOT_PUBLISHER', 'blogger'))
+        
+        # Long URL -> Bitly link, so repeat ASINs don't spend quota
+        self.short_url_cache = {}
+        
         # Add retry configuration
         self.max_retries = 3
         self.retry_delay = 5  # seconds
         
+        # Posting schedule; next_post_at is when the main loop posts next
+        self.post_interval = 60 * 60  # seconds
+        self.next_post_at = 0
+        self.post_count = 0
+        self.consecutive_failures = 0
+        
+        # Warm state (token, caches, queue, schedule) survives restarts in a
+        # snapshot written periodically and on shutdown. Coordinated instances
+        # share the data dir, so each keeps its own snapshot named after
+        # BOT_INSTANCE_ID; without a stable id there is nothing to restore into
+        self.snapshot_path = os.path.join(self.data_dir, 'state.json')
+        if self.coordinator is not None:
+            if os.getenv('BOT_INSTANCE_ID'):
+                instance_name = re.sub(r'[^A-Za-z0-9_.-]', '_', self.coordinator.instance_id)
+                self.snapshot_path = os.path.join(self.data_dir, f'state-{instance_name}.json')
+            else:
+                logger.warning("⚠️ BOT_INSTANCE_ID not set - state snapshots disabled for this coordinated instance")
+                self.snapshot_path = None
+        self.snapshot_interval = 5 * 60  # seconds
+        self.snapshot_max_age = 24 * 3600  # older snapshots are ignored
+        self.snapshot_lock = Lock()  # serializes save_snapshot across threads
+        self.blogger_verified_at = 0  # last time Blogger accepted our token
+        
+        # Time budget for one posting cycle, of which post_reserve is kept back
+        # for the Blogger call, and the bound on graceful shutdown after SIGTERM
+        self.cycle_budget = 10 * 60  # seconds
+        self.post_reserve = 90  # seconds
+        self.shutdown_timeout = float(os.getenv('BOT_SHUTDOWN_TIMEOUT', '20'))  # seconds
+        self.timeout_scale = 1.0  # multiplier for per-request timeouts
+        self.max_retry_after = 60  # longest Retry-After worth waiting for inside a cycle
+        self.gemini_paused_until = 0.0  # set by a Gemini rate limit too long to wait out
+        self.bitly_paused_until = 0.0  # likewise for Bitly shortening
+        
         # Determine token type on initialization
         self._analyze_token_type()
         
+        # All upstream HTTP goes through one pooled session, which can record
+        # cycles to a cassette or replay them offline (BOT_HTTP_MODE=record|replay)
+        self.http = self._create_http_session()
+        self.http_pool_size = requests.adapters.DEFAULT_POOLSIZE
+        
+        # Optional JSON config (BOT_CONFIG) overriding the settings above. It is
+        # re-read when the file changes; new settings are staged and applied
+        # between posting cycles, which hold cycle_lock while they run
+        self.cycle_lock = Lock()
+        self.config_path = os.getenv('BOT_CONFIG')
+        self.config_poll_interval = 10  # seconds
+        self.config_mtime = None
+        self.config = {}
+        if self.config_path:
+            self.config_mtime = os.stat(self.config_path).st_mtime_ns
+            self.apply_config(load_bot_config(self.config_path))
+        
+        # Restore warm state only now: the snapshot is matched against the
+        # configured blog, and its next_post_at was already scheduled on the
+        # configured interval (next_post_at is still 0 above, so the initial
+        # apply_config has nothing to re-anchor)
+        self.restored_state = self.restore_snapshot()
+        
     def _analyze_token_type(self):
         """Analyze and determine the type of token we have"""
         if not self.refresh_token:
@@ -118,10 +2219,249 @@ class AmazonAffiliateBlogBot:
                 self.token_type = 'refresh'
                 logger.info("✅ Assuming refresh token based on format")
         
+    def _create_http_session(self):
+        """Build the HTTP session for the configured mode"""
+        mode = os.getenv('BOT_HTTP_MODE', '').lower()
+        cassette = os.getenv('BOT_CASSETTE', os.path.join(self.data_dir, 'cassette.jsonl'))
+        if mode == 'record':
+            logger.info(f"📼 Recording upstream traffic to {cassette}")
+            return RecordingSession(
+                cassette,
+                secrets=[self.gemini_api_key, self.bitly_token, self.refresh_token, self.client_id, self.client_secret],
+                metadata={"token_type": self.token_type}
+            )
+        if mode == 'replay':
+            scale = float(os.getenv('BOT_REPLAY_LATENCY_SCALE', '1.0'))
+            logger.info(f"📼 Replaying upstream traffic from {cassette} (latency x{scale})")
+            return ReplaySession(cassette, scale)
+        return requests.Session()
+
+    def snapshot_state(self):
+        """Runtime state worth keeping across a restart, as plain JSON data"""
+        now = time.time()
+        token = None
+        if self.access_token and self.token_expires_at > now:
+            token = {"access_token": self.access_token, "expires_at": self.token_expires_at}
+        return {
+            "version": 1,
+            "saved_at": now,
+            "blogger_id": self.blogger_id,
+            # Fingerprint only: a restored token must belong to the configured credential
+            "credential": QuotaLedger.credential_id(self.refresh_token or ''),
+            "token": token,
+            "blogger_verified_at": self.blogger_verified_at,
+            "posted_products": sorted(self.posted_products),
+            "short_url_cache": dict(self.short_url_cache),
+            "content_queue": [{"product": {name: getattr(product, name) for name in Product.__slots__},
+                               "content": content_data} for product, content_data in self.content_queue],
+            "schedule": {
+                "next_post_at": self.next_post_at,
+                "post_count": self.post_count,
+                "consecutive_failures": self.consecutive_failures
+            },
+            "post_times": self.scorer.export_post_times(),
+            "gemini_stats": self.gemini_stats
+        }
+
+    def save_snapshot(self):
+        """Atomically write the state snapshot (owner-readable only: it holds the access token)"""
+        if self.snapshot_path is None:
+            return False
+        try:
+            # Saved from the snapshot thread, the main loop and the shutdown
+            # watchdog; the lock keeps an older state from landing last
+            with self.snapshot_lock:
+                write_file_atomic(self.snapshot_path, json.dumps(self.snapshot_state()), mode=0o600)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"❌ Could not save state snapshot: {e}")
+            return False
+
+    def restore_snapshot(self):
+        """Load a fresh, matching snapshot into the bot; returns True if one was restored"""
+        if self.snapshot_path is None:
+            return False
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable state snapshot: {e}")
+            return False
+        if not isinstance(state, dict):
+            logger.warning("⚠️ Ignoring state snapshot: top level is not an object")
+            return False
+        try:
+            return self._apply_snapshot(state)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"⚠️ Ignoring malformed state snapshot: {e}")
+            return False
+
+    def _apply_snapshot(self, state):
+        """Restore a parsed snapshot; every field is read before any is applied,
+        so a malformed snapshot raises without leaving the bot half-restored"""
+        now = time.time()
+        age = now - float(state.get("saved_at", 0))
+        if state.get("version") != 1 or state.get("blogger_id") != self.blogger_id:
+            logger.warning("⚠️ Ignoring state snapshot from another version or blog")
+            return False
+        if not 0 <= age <= self.snapshot_max_age:
+            logger.warning(f"⚠️ Ignoring stale state snapshot ({age / 3600:.1f}h old)")
+            return False
+        
+        token = state.get("token")
+        same_credential = state.get("credential") == QuotaLedger.credential_id(self.refresh_token or '')
+        if token and same_credential and float(token["expires_at"]) - 300 > now:
+            token = (str(token["access_token"]), float(token["expires_at"]), float(state.get("blogger_verified_at", 0)))
+        else:
+            token = None
+        
+        posted_products = set(state.get("posted_products", []))
+        short_url_cache = dict(state.get("short_url_cache", {}))
+        post_times = state.get("post_times", {})
+        post_times = {
+            "asins": {str(asin): float(when) for asin, when in post_times.get("asins", {}).items()},
+            "categories": {str(category): float(when) for category, when in post_times.get("categories", {}).items()}
+        }
+        gemini_stats = {mode: dict(stats) for mode, stats in state.get("gemini_stats", {}).items()
+                        if mode in self.gemini_stats}
+        
+        # Queued articles whose ASIN went out since the snapshot (e.g. from
+        # another process) are dropped rather than posted twice
+        saved_at = float(state["saved_at"])
+        queued = [(Product(**item["product"]), dict(item["content"])) for item in state.get("content_queue", [])]
+        queued = [(product, content) for product, content in queued
+                  if not self.post_archive.posted_since(product.asin, saved_at)]
+        
+        schedule = state.get("schedule", {})
+        next_post_at = float(schedule.get("next_post_at", 0))
+        post_count = int(schedule.get("post_count", 0))
+        consecutive_failures = int(schedule.get("consecutive_failures", 0))
+        
+        if token:
+            self.access_token, self.token_expires_at, self.blogger_verified_at = token
+        self.posted_products.update(posted_products)
+        self.short_url_cache.update(short_url_cache)
+        self.scorer.import_post_times(post_times)
+        for mode, stats in gemini_stats.items():
+            self.gemini_stats[mode].update(stats)
+        self.content_queue.extend(queued)
+        self.next_post_at = next_post_at
+        self.post_count = post_count
+        self.consecutive_failures = consecutive_failures
+        logger.info(f"♻️ Restored state from {age / 60:.0f} min ago: {len(self.content_queue)} queued article(s), "
+                    f"{len(self.short_url_cache)} short links, token {'kept' if self.access_token else 'not kept'}")
+        return True
+
+    def snapshot_loop(self):
+        """Save the state snapshot periodically so a hard kill loses little"""
+        while not self.shutdown_event.wait(self.snapshot_interval):
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                logger.error(f"❌ Snapshot loop error: {e}")
+
+    def _create_asin_validator(self):
+        return AsinValidator(os.path.join(self.data_dir, 'asins.sqlite3'),
+                             concurrency=self.asin_validator_concurrency,
+                             per_host_concurrency=self.asin_validator_per_host)
+
+    def _resize_http_pool(self, size):
+        """Remount the session adapters; in-flight requests keep their old pool"""
+        for prefix in ('https://', 'http://'):
+            self.http.mount(prefix, HTTPAdapter(pool_connections=size, pool_maxsize=size))
+
+    def apply_config(self, config):
+        """Apply validated settings to the running bot; caches, tokens and queues are kept.
+        
+        Settings missing from the file keep their current value. Raises
+        ConfigError, changing nothing, if the merged settings are inconsistent.
+        """
+        check_bot_settings({key: config.get(key, getattr(self, attr)) for key, (_, _, attr) in BOT_CONFIG_FIELDS.items()})
+        previous = {key: getattr(self, BOT_CONFIG_FIELDS[key][2]) for key in config}
+        changed = {key: value for key, value in config.items() if previous[key] != value}
+        for key, value in changed.items():
+            setattr(self, BOT_CONFIG_FIELDS[key][2], value)
+        self.config = config
+        
+        if {"trending_categories", "asins_by_category", "high_intent_keywords"} & changed.keys():
+            self.scorer.candidates = None  # rebuilt from the new catalog on the next tick
+        if "asin_validator_concurrency" in changed or "asin_validator_per_host" in changed:
+            # The cached statuses live in SQLite, so the new validator starts warm
+            self.asin_validator = self._create_asin_validator()
+        if "blogger_id" in changed:
+            self.blogger_credential = QuotaLedger.credential_id(self.blogger_id)
+        if "http_pool_size" in changed:
+            self._resize_http_pool(self.http_pool_size)
+        if "post_interval" in changed and self.next_post_at:
+            # Re-anchor the pending post on the new interval
+            self.next_post_at += self.post_interval - previous["post_interval"]
+        if changed:
+            logger.info(f"⚙️ Applied config: {', '.join(sorted(changed))}")
+        return changed
+
+    def config_watch_loop(self):
+        """Poll the config file's mtime and apply valid changes between cycles"""
+        logger.info(f"⚙️ Watching {self.config_path} for changes")
+        while not self.shutdown_event.wait(self.config_poll_interval):
+            try:
+                mtime = os.stat(self.config_path).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"⚠️ Config file unavailable, keeping current settings: {e}")
+                continue
+            if mtime == self.config_mtime:
+                continue
+            self.config_mtime = mtime
+            try:
+                config = load_bot_config(self.config_path)
+                # Blocks until an in-flight cycle finishes, so a cycle never sees a mix
+                with self.cycle_lock:
+                    self.apply_config(config)
+            except ConfigError as e:
+                logger.error(f"❌ Config rejected, keeping current settings: {e}")
+
+    def _create_publisher(self, backend):
+        """Build the configured publishing backend"""
+        if backend == 'static':
+            root = os.getenv('BOT_STATIC_SITE_DIR', os.path.join(self.data_dir, 'site'))
+            site_url = os.getenv('BOT_STATIC_SITE_URL', self.blogger_url)
+            logger.info(f"📄 Publishing to static site in {root}")
+            return StaticSitePublisher(root, site_url, archive=self.post_archive)
+        if backend != 'blogger':
+            logger.warning(f"⚠️ Unknown publisher '{backend}', using Blogger")
+        return BloggerPublisher(self)
+
+    def is_leader(self):
+        """True if this instance should run singleton background jobs"""
+        return self.coordinator is None or self.coordinator.is_leader()
+
+    def wait_for_leadership(self):
+        """Block until this instance leads (immediately without coordination); False on shutdown"""
+        while not self.is_leader():
+            if self.shutdown_event.wait(self.coordinator.lease_ttl / 2):
+                return False
+        return not self.shutdown_event.is_set()
+
+    def _deadline(self, deadline):
+        """Use the caller's deadline, or one that only tracks shutdown"""
+        return deadline if deadline is not None else Deadline(shutdown_event=self.shutdown_event,
+                                                              timeout_scale=self.timeout_scale)
+
+    def _enforce_shutdown_bound(self):
+        """Force the process to exit if graceful shutdown overruns its bound"""
+        time.sleep(self.shutdown_timeout)
+        logger.error(f"⏱️ Graceful shutdown exceeded {self.shutdown_timeout}s - forcing exit")
+        self.save_snapshot()
+        logging.shutdown()
+        os._exit(1)
+
     def setup_signal_handlers(self):
         """Setup signal handlers for graceful shutdown"""
         def signal_handler(signum, frame):
             logger.info(f"🛑 Received signal {signum}, initiating graceful shutdown...")
+            if not self.shutdown_event.is_set():
+                Thread(target=self._enforce_shutdown_bound, daemon=True).start()
             self.shutdown_event.set()
         
         signal.signal(signal.SIGTERM, signal_handler)
@@ -148,21 +2488,22 @@ class AmazonAffiliateBlogBot:
         
         return True
 
-    def get_access_token(self):
+    def get_access_token(self, deadline=None):
         """Get valid access token with improved handling for both token types"""
+        deadline = self._deadline(deadline)
         try:
             current_time = time.time()
             
-            # If we have a valid access token that hasn't expired, use it
+            # If we have a valid access token that hasn't expired, use it -
+            # including one refreshed earlier (or restored from a snapshot)
             if (self.access_token and 
-                current_time < (self.token_expires_at - 300) and  # 5-minute buffer
-                self.token_type == 'access'):
+                current_time < (self.token_expires_at - 300)):  # 5-minute buffer
                 return self.access_token
             
             # If we have a refresh token, try to get a new access token
             if self.token_type == 'refresh':
                 logger.info("🔄 Refreshing access token using refresh token...")
-                return self._refresh_access_token()
+                return self._refresh_access_token(deadline)
             
             # If we have an access token but it might be expired, try to use it anyway
             # (sometimes tokens work longer than expected)
@@ -182,8 +2523,9 @@ class AmazonAffiliateBlogBot:
             logger.error(f"❌ Critical error in get_access_token: {e}")
             return None
 
-    def _refresh_access_token(self):
+    def _refresh_access_token(self, deadline=None):
         """Refresh access token using refresh token"""
+        deadline = self._deadline(deadline)
         if not self.client_id or not self.client_secret:
             logger.error("❌ Cannot refresh token: missing client credentials")
             logger.info("💡 Please set GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables")
@@ -204,8 +2546,8 @@ class AmazonAffiliateBlogBot:
                 }
                 
                 logger.info(f"🔄 Attempting token refresh (attempt {retry + 1}/3)...")
-                response = requests.post('https://oauth2.googleapis.com/token', 
-                                       headers=headers, data=data, timeout=20)
+                response = self.http.post(self.oauth_token_url, 
+                                       headers=headers, data=data, timeout=deadline.timeout(20))
                 
                 if response.status_code == 200:
                     token_data = response.json()
@@ -227,22 +2569,25 @@ class AmazonAffiliateBlogBot:
                         return None
                     
                     if retry < 2:
-                        time.sleep(2)
+                        if not deadline.sleep(2):
+                            break
                         continue
                         
             except Exception as e:
                 logger.error(f"❌ Token refresh error (attempt {retry + 1}): {e}")
                 if retry < 2:
-                    time.sleep(2)
+                    if not deadline.sleep(2):
+                        break
                     continue
         
         return None
 
-    def test_blogger_access(self):
+    def test_blogger_access(self, deadline=None):
         """Test if we can access Blogger API with improved error handling"""
+        deadline = self._deadline(deadline)
         logger.info("🧪 Testing Blogger API access...")
         
-        access_token = self.get_access_token()
+        access_token = self.get_access_token(deadline)
         if not access_token:
             logger.error("❌ No access token available for testing")
             return False
@@ -253,14 +2598,15 @@ class AmazonAffiliateBlogBot:
         }
         
         # Test with blog info endpoint (read-only)
-        url = f"https://www.googleapis.com/blogger/v3/blogs/{self.blogger_id}"
+        url = f"{self.blogger_api_base}/blogs/{self.blogger_id}"
         
         try:
-            response = requests.get(url, headers=headers, timeout=15)
+            response = self.http.get(url, headers=headers, timeout=deadline.timeout(15))
             
             if response.status_code == 200:
                 blog_data = response.json()
                 logger.info(f"✅ Blogger API access confirmed for: {blog_data.get('name', 'Unknown Blog')}")
+                self.blogger_verified_at = time.time()
                 return True
             elif response.status_code == 401:
                 logger.error("❌ Authentication failed - token is invalid or expired")
@@ -301,19 +2647,214 @@ class AmazonAffiliateBlogBot:
                 logger.error(f"❌ Keep-alive error: {e}")
                 self.shutdown_event.wait(60)  # Wait 1 minute before retry
 
-    def get_amazon_product_image(self, asin):
+    def catalog_asins(self):
+        """Every distinct ASIN in the catalog"""
+        return list(dict.fromkeys(asin for asins in self.real_asins_by_category.values() for asin in asins))
+
+    def asin_validation_loop(self):
+        """Re-check stale catalog ASINs in the background, off the posting path"""
+        logger.info("🔎 ASIN validation service started")
+        while not self.shutdown_event.is_set():
+            try:
+                if self.is_leader():
+                    counts = self.asin_validator.validate(self.catalog_asins(), self.shutdown_event)
+                    logger.info(f"🔎 ASIN validation: {counts}, "
+                                f"{len(self.asin_validator.unavailable_asins)} unavailable")
+                else:
+                    # Pick up what the leader found (instances share BOT_DATA_DIR)
+                    self.asin_validator.reload()
+            except Exception as e:
+                logger.error(f"❌ ASIN validation error: {e}")
+            self.shutdown_event.wait(self.asin_validation_interval)
+
+    def apply_click_through_rates(self):
+        """Feed stored click aggregates into the product scorer"""
+        since = (datetime.now(timezone.utc) - timedelta(days=self.click_window_days)).strftime("%Y-%m-%d")
+        by_asin, by_category = self.click_analytics.click_through_rates(since, self.scorer.ctr_prior)
+        for asin, ctr in by_asin.items():
+            self.scorer.record_click_through(asin, ctr)
+        for category, ctr in by_category.items():
+            self.scorer.record_category_click_through(category, ctr)
+        return len(by_asin), len(by_category)
+
+    def _bitly_get(self, url, params=None, deadline=None):
+        """GET a Bitly API URL, honouring Retry-After once on 429; returns JSON or None"""
+        deadline = self._deadline(deadline)
+        headers = {
+            'Authorization': f'Bearer {self.bitly_token}',
+            'User-Agent': 'Amazon-Affiliate-Bot/1.0'
+        }
+        for attempt in range(2):
+            if self.quota_ledger.plan("bitly_analytics", self.bitly_credential) == "exhausted":
+                logger.warning("⚠️ Bitly analytics quota exhausted")
+                return None
+            response = self.http.get(url, headers=headers, params=params, timeout=deadline.timeout(30))
+            self.quota_ledger.record("bitly_analytics", self.bitly_credential)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code == 429 and attempt == 0:
+                retry_after = float(response.headers.get('Retry-After', 60))
+                logger.warning(f"⚠️ Bitly rate limited - retrying in {retry_after:.0f}s")
+                if deadline.sleep(retry_after):
+                    continue
+            logger.warning(f"⚠️ Bitly API response: {response.status_code} - {response.text[:200]}")
+            return None
+        return None
+
+    def ingest_click_metrics(self, deadline=None, max_days=30, page_size=100, sorted_size=1000, max_summaries=100):
+        """Pull new Bitly links and per-day click counts since the last run.
+        
+        New links are listed with created_after and followed through
+        pagination.next. Clicks are fetched once per completed UTC day not yet
+        synced, using the group's click-sorted link list. Per-link summaries
+        are only requested when that list is full and may have cut off links,
+        at most max_summaries per run and only while the analytics quota is
+        not degraded; a day whose cut-off tail is longer than that keeps just
+        the sorted list. A day is only marked synced once all of it is
+        fetched; an unfinished day keeps what it has and continues next run.
+        """
+        deadline = self._deadline(deadline)
+        base = self.bitly_api_base
+        stats = {"requests": 0, "new_links": 0, "days": 0, "clicks": 0, "summaries": 0, "truncated_days": 0}
+        try:
+            group = self.click_analytics.get_state('group_guid')
+            if not group:
+                user = self._bitly_get(f"{base}/user", deadline=deadline)
+                stats["requests"] += 1
+                if not user:
+                    return stats
+                group = user['default_group_guid']
+                self.click_analytics.set_state('group_guid', group)
+            
+            # 1. Links created since the last run (ours and any made elsewhere)
+            # Links made outside this process get the ASIN's first catalog category
+            catalog_category = {}
+            for category, asins in self.real_asins_by_category.items():
+                for asin in asins:
+                    catalog_category.setdefault(asin, category)
+            
+            created_after = int(float(self.click_analytics.get_state('links_created_after', '0')))
+            newest = created_after
+            url = f"{base}/groups/{group}/bitlinks"
+            params = {'size': page_size, 'created_after': created_after}
+            while url:
+                page = self._bitly_get(url, params, deadline)
+                stats["requests"] += 1
+                if not page:
+                    break
+                rows = []
+                for link in page.get('links', []):
+                    long_url = link.get('long_url', '')
+                    match = re.search(r'/dp/([A-Z0-9]{10})', long_url)
+                    created = parse_bitly_time(link['created_at']) if link.get('created_at') else None
+                    asin = match.group(1) if match else None
+                    rows.append((link.get('id') or link.get('link'), long_url, asin, catalog_category.get(asin), created))
+                    newest = max(newest, int(created or 0))
+                self.click_analytics.register_links(rows)
+                stats["new_links"] += len(rows)
+                # pagination.next is a complete URL including the original filters
+                url = (page.get('pagination') or {}).get('next') or None
+                params = None
+            if newest > created_after:
+                self.click_analytics.set_state('links_created_after', newest)
+            
+            # 2. Clicks for every completed day since the last synced one
+            today = datetime.now(timezone.utc).date()
+            last_day = self.click_analytics.get_state('clicks_synced_through')
+            first = (datetime.strptime(last_day, "%Y-%m-%d").date() + timedelta(days=1)) if last_day \
+                else today - timedelta(days=max_days)
+            first = max(first, today - timedelta(days=max_days))
+            # A day left unfinished by an earlier run: the summary cursor it reached
+            partial = json.loads(self.click_analytics.get_state('clicks_partial') or '{}')
+            day = first
+            while day < today:
+                day_end = datetime(day.year, day.month, day.day, 23, 59, 59, tzinfo=timezone.utc)
+                query = {'unit': 'day', 'units': 1, 'size': sorted_size,
+                         'unit_reference': day_end.strftime("%Y-%m-%dT%H:%M:%S+0000")}
+                result = self._bitly_get(f"{base}/groups/{group}/bitlinks/clicks", query, deadline)
+                stats["requests"] += 1
+                if result is None:
+                    break
+                clicks = {item['id']: item.get('clicks', 0) for item in result.get('sorted_links', [])}
+                
+                # A full, still-non-zero list may hide links with fewer clicks;
+                # only links that existed by the end of the day can have any
+                resumed = partial.get('day') == day.isoformat()
+                after = partial.get('after', '') if resumed else ''
+                complete = True
+                sorted_links = result.get('sorted_links', [])
+                if len(sorted_links) >= sorted_size and sorted_links[-1].get('clicks', 0) > 0:
+                    tail = [link for link in self.click_analytics.known_links(created_before=day_end.timestamp(), after=after)
+                            if link not in clicks]
+                    if not resumed and len(tail) > max_summaries:
+                        # More than a run may spend: the quota could never cover it, so keep
+                        # the sorted list, whose links out-click every one left out
+                        logger.warning(f"⚠️ Clicks for {day.isoformat()} truncated to the top {len(sorted_links)} links "
+                                       f"({len(tail)} more with at most {sorted_links[-1].get('clicks', 0)} clicks each)")
+                        stats["truncated_days"] += 1
+                        tail = []
+                    for link in tail:
+                        if stats["summaries"] >= max_summaries or \
+                                self.quota_ledger.plan("bitly_analytics", self.bitly_credential) != "ok":
+                            complete = False
+                            break
+                        summary = self._bitly_get(f"{base}/bitlinks/{link}/clicks/summary", query, deadline)
+                        stats["requests"] += 1
+                        stats["summaries"] += 1
+                        if summary is None:
+                            complete = False
+                            break
+                        clicks[link] = summary.get('total_clicks', 0)
+                        after = link
+                
+                # A resumed day merges into the counts stored by earlier runs
+                self.click_analytics.store_day(day.isoformat(), clicks, replace=not resumed)
+                if not complete:
+                    self.click_analytics.set_state('clicks_partial', json.dumps({"day": day.isoformat(), "after": after}))
+                    logger.info(f"📈 Clicks for {day.isoformat()} incomplete, continuing next run")
+                    break
+                self.click_analytics.set_state('clicks_partial', '')
+                self.click_analytics.set_state('clicks_synced_through', day.isoformat())
+                stats["days"] += 1
+                stats["clicks"] += sum(clicks.values())
+                day += timedelta(days=1)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"⚠️ Click ingestion network error: {e}")
+        
+        asins, categories = self.apply_click_through_rates()
+        logger.info(f"📈 Click ingestion: {stats}; weighting {asins} ASINs / {categories} categories")
+        return stats
+
+    def click_ingestion_loop(self):
+        """Ingest Bitly click metrics periodically, off the posting path"""
+        logger.info("📈 Click ingestion service started")
+        while not self.shutdown_event.is_set():
+            try:
+                if self.is_leader():
+                    self.ingest_click_metrics(Deadline(15 * 60, self.shutdown_event), self.click_window_days)
+                else:
+                    # The leader ingests; followers reload its rates from the shared store
+                    self.apply_click_through_rates()
+            except Exception as e:
+                logger.error(f"❌ Click ingestion error: {e}")
+            self.shutdown_event.wait(self.click_sync_interval)
+
+    def get_amazon_product_image(self, asin, deadline=None):
         """Get real Amazon product image URL"""
+        deadline = self._deadline(deadline)
         try:
             # Amazon product image URL patterns
             image_sizes = ["_AC_SL1500_", "_AC_SL1000_", "_AC_SL800_", "_AC_SL500_"]
             
             # Try different Amazon image URL patterns
             for size in image_sizes:
-                image_url = f"https://m.media-amazon.com/images/I/{asin}.jpg"
+                if deadline.expired():
+                    break
+                image_url = f"{self.amazon_image_base}/{asin}.jpg"
                 
                 # Test if image exists
                 try:
-                    response = requests.head(image_url, timeout=5)
+                    response = self.http.head(image_url, timeout=deadline.timeout(5))
                     if response.status_code == 200:
                         logger.info(f"✅ Found Amazon product image: {image_url}")
                         return image_url
@@ -330,66 +2871,50 @@ class AmazonAffiliateBlogBot:
             logger.error(f"❌ Error getting product image: {e}")
             return "https://via.placeholder.com/400x400/667eea/ffffff?text=Product"
 
-    def get_trending_products(self):
-        """Get trending Amazon products with real Amazon ASINs and images"""
-        try:
-            category = random.choice(self.trending_categories)
-            search_term = f"{random.choice(self.high_intent_keywords)} {category}"
-            
-            # Real Amazon ASINs for different categories (these are real products)
-            real_asins_by_category = {
-                "electronics": ["B08N5WRWNW", "B07FZ8S74R", "B08R6K1Y1K", "B09G91L2YV", "B084JBQZPX"],
-                "home-kitchen": ["B07V34FMJX", "B08567C98J", "B08Q3M88GK", "B08FQPVFLL", "B07P6Y1JXY"],
-                "fashion": ["B07KGCFMZX", "B08NDHZ8L4", "B09334JJQP", "B087CJSB7K", "B08M5QRXZC"],
-                "beauty": ["B07RJMQ2GY", "B08BZ5TYLK", "B07G8N2G3C", "B089H89JT8", "B08F9DGSMR"],
-                "sports-outdoors": ["B07X8Z8W1P", "B08M8TD9RZ", "B086R9D6V2", "B089WXBHX5", "B07S9XHJ2Q"],
-                "automotive": ["B07BFQMFN6", "B084JBQZPX", "B07YTB7D3L", "B08FQMCJKQ", "B089WXPQR4"],
-                "tools-home-improvement": ["B07F7V8Z5R", "B08MZQK7GR", "B07K2Y9QSJ", "B089WXBHX5", "B07RJMQ2GY"],
-                "toys-games": ["B08567C98J", "B08Q3M88GK", "B07X8Z8W1P", "B089H89JT8", "B087CJSB7K"],
-                "health-personal-care": ["B07G8N2G3C", "B08BZ5TYLK", "B08F9DGSMR", "B089H89JT8", "B07RJMQ2GY"],
-                "books": ["B08N5WRWNW", "B07FZ8S74R", "B08R6K1Y1K", "B09G91L2YV", "B084JBQZPX"],
-                "baby-products": ["B07V34FMJX", "B08567C98J", "B08Q3M88GK", "B08FQPVFLL", "B07P6Y1JXY"],
-                "pet-supplies": ["B07KGCFMZX", "B08NDHZ8L4", "B09334JJQP", "B087CJSB7K", "B08M5QRXZC"],
-                "garden-lawn": ["B07X8Z8W1P", "B08M8TD9RZ", "B086R9D6V2", "B089WXBHX5", "B07S9XHJ2Q"],
-                "musical-instruments": ["B07BFQMFN6", "B084JBQZPX", "B07YTB7D3L", "B08FQMCJKQ", "B089WXPQR4"]
-            }
-            
-            # Get ASINs for the selected category
-            available_asins = real_asins_by_category.get(category, real_asins_by_category["electronics"])
+    def build_product(self, asin, category, resolve_image=True, rng=None):
+        """Build a product record for an ASIN in the given category"""
+        rng = rng or random
+        category_name = category.replace('-', ' ').title()
+        product_names = [
+            f"{rng.choice(self.high_intent_keywords).title()} {category_name}",
+            f"Professional {category_name} Kit",
+            f"Premium {category_name} Set",
+            f"Advanced {category_name} System",
+            f"Elite {category_name} Collection"
+        ]
+        
+        return Product(
+            title=rng.choice(product_names),
+            price=f"${rng.randint(25, 299)}.{rng.randint(10, 99)}",
+            rating=round(rng.uniform(4.2, 4.9), 1),
+            reviews=rng.randint(500, 5000),
+            asin=asin,
+            category=category,
+            image=self.get_amazon_product_image(asin) if resolve_image else None
+        )
+
+    def get_trending_products(self, deadline=None):
+        """Get the top-scoring Amazon products across the whole catalog, best first"""
+        deadline = self._deadline(deadline)
+        try:
+            # One candidate per (category, ASIN) pair, built once and kept as
+            # arrays in the scorer until the catalog config changes; a category
+            # without ASINs contributes no candidates
+            if self.scorer.candidates is None:
+                self.scorer.set_candidates(
+                    self.build_product(asin, category, resolve_image=False)
+                    for category in self.trending_categories
+                    for asin in self.real_asins_by_category.get(category, [])
+                )
             
-            products = []
-            for i in range(3):
-                asin = random.choice(available_asins)
-                
-                product_names = [
-                    f"{random.choice(self.high_intent_keywords).title()} {category.replace('-', ' ').title()}",
-                    f"Professional {category.replace('-', ' ').title()} Kit",
-                    f"Premium {category.replace('-', ' ').title()} Set",
-                    f"Advanced {category.replace('-', ' ').title()} System",
-                    f"Elite {category.replace('-', ' ').title()} Collection"
-                ]
-                
-                # Get Amazon product image
-                image_url = self.get_amazon_product_image(asin)
-                
-                product = {
-                    "title": random.choice(product_names),
-                    "price": f"${random.randint(25, 299)}.{random.randint(10, 99)}",
-                    "rating": round(random.uniform(4.2, 4.9), 1),
-                    "reviews": random.randint(500, 5000),
-                    "asin": asin,
-                    "image": image_url,
-                    "features": [
-                        f"Premium quality {category.replace('-', ' ')} construction",
-                        "High customer satisfaction rating",
-                        "Amazon Prime eligible with fast shipping",
-                        "1-year manufacturer warranty included",
-                        "30-day hassle-free return policy"
-                    ]
-                }
-                products.append(product)
+            # Images are only resolved for the winners since that costs HTTP requests
+            products = [copy.copy(product) for product in self.scorer.select(
+                self.products_per_cycle, exclude=self.asin_validator.unavailable_asins)]
+            for product in products:
+                product.image = self.get_amazon_product_image(product.asin, deadline)
             
-            logger.info(f"✅ Generated {len(products)} products for category: {category}")
+            logger.info(f"✅ Selected top {len(products)} of {len(self.scorer.candidates)} scored products "
+                        f"(best: {products[0].asin if products else 'none'} in {products[0].category if products else 'n/a'})")
             return products
             
         except Exception as e:
@@ -402,8 +2927,21 @@ class AmazonAffiliateBlogBot:
         affiliate_url = f"{base_url}?tag={self.amazon_tag}&linkCode=as2&camp=1789&creative=9325"
         return affiliate_url
 
-    def shorten_url(self, long_url):
+    def shorten_url(self, long_url, deadline=None):
         """Shorten URL using Bitly with retry logic - handles quota limits"""
+        deadline = self._deadline(deadline)
+        if long_url in self.short_url_cache:
+            logger.info(f"✅ Using cached short URL: {self.short_url_cache[long_url]}")
+            return self.short_url_cache[long_url]
+        
+        if time.time() < self.bitly_paused_until:
+            logger.warning("⚠️ Bitly rate limited - using original URL")
+            return long_url
+        quota_plan = self.quota_ledger.plan("bitly", self.bitly_credential)
+        if quota_plan != "ok":
+            logger.warning(f"⚠️ Bitly quota {quota_plan} - using original URL")
+            return long_url
+        
         for attempt in range(self.max_retries):
             try:
                 headers = {
@@ -417,27 +2955,43 @@ class AmazonAffiliateBlogBot:
                     'domain': 'bit.ly'
                 }
                 
-                response = requests.post('https://api-ssl.bitly.com/v4/shorten', 
-                                       headers=headers, json=data, timeout=15)
+                response = self.http.post(f'{self.bitly_api_base}/shorten', 
+                                       headers=headers, json=data, timeout=deadline.timeout(15))
+                self.quota_ledger.record("bitly", self.bitly_credential)
                 
                 if response.status_code in [200, 201]:
                     short_url = response.json()['link']
+                    self.short_url_cache[long_url] = short_url
                     logger.info(f"✅ URL shortened: {short_url}")
                     return short_url
                 elif response.status_code == 429:
-                    logger.warning("⚠️ Bitly quota reached - using original URL")
-                    return long_url  # Return original URL when quota exceeded
+                    # Only a missing Retry-After, or one reaching past the month's
+                    # reset, means the monthly quota; anything shorter is a rate limit
+                    retry_after = response.headers.get('Retry-After', '')
+                    if not retry_after.isdigit() or int(retry_after) >= self.quota_ledger.seconds_left("monthly"):
+                        logger.warning("⚠️ Bitly quota reached - using original URL")
+                        self.quota_ledger.mark_exhausted("bitly", self.bitly_credential, "monthly")
+                        return long_url  # Return original URL when quota exceeded
+                    if int(retry_after) <= self.max_retry_after and attempt < self.max_retries - 1:
+                        logger.warning(f"⚠️ Bitly rate limited - retrying in {retry_after}s")
+                        if deadline.sleep(int(retry_after)):
+                            continue
+                    logger.warning(f"⚠️ Bitly rate limited for {retry_after}s - using original URL")
+                    self.bitly_paused_until = time.time() + int(retry_after)
+                    return long_url
                 else:
                     logger.warning(f"⚠️ Bitly API response: {response.status_code} - {response.text}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        if not deadline.sleep(self.retry_delay):
+                            break
                         continue
                     return long_url
                     
             except requests.exceptions.RequestException as e:
                 logger.error(f"❌ URL shortening network error (attempt {attempt + 1}/{self.max_retries}): {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    if not deadline.sleep(self.retry_delay):
+                        break
                     continue
             except Exception as e:
                 logger.error(f"❌ URL shortening error: {e}")
@@ -445,12 +2999,78 @@ class AmazonAffiliateBlogBot:
         
         return long_url
 
-    def generate_seo_content(self, product):
+    def _gemini_url(self, api_version="v1"):
+        """Gemini generateContent endpoint for the configured model"""
+        return f"{self.gemini_api_base}/{api_version}/models/gemini-1.5-flash:generateContent?key={self.gemini_api_key}"
+
+    def _record_gemini_usage(self, mode, articles, latency, result=None):
+        """Accumulate per-mode request, token and latency totals for the Gemini report"""
+        usage = (result or {}).get('usageMetadata', {})
+        stats = self.gemini_stats[mode]
+        stats['requests'] += 1
+        stats['articles'] += articles
+        stats['prompt_tokens'] += usage.get('promptTokenCount', 0)
+        stats['output_tokens'] += usage.get('candidatesTokenCount', 0)
+        stats['latency'] += latency
+        if articles:
+            logger.info(f"📊 Gemini {mode}: {articles} article(s) in {latency:.1f}s, "
+                        f"{usage.get('totalTokenCount', 0) / articles:.0f} tokens/article")
+
+    def gemini_usage_report(self):
+        """Tokens and latency per article for single-item and batch generation"""
+        report = {}
+        for mode, stats in self.gemini_stats.items():
+            articles = stats['articles']
+            report[mode] = {
+                "requests": stats['requests'],
+                "articles": articles,
+                "prompt_tokens_per_article": round(stats['prompt_tokens'] / articles, 1) if articles else None,
+                "output_tokens_per_article": round(stats['output_tokens'] / articles, 1) if articles else None,
+                "latency_per_article_s": round(stats['latency'] / articles, 2) if articles else None
+            }
+        return report
+
+    def _gemini_quota_ok(self):
+        """Check the quota ledger before spending a Gemini request"""
+        if time.time() < self.gemini_paused_until:
+            logger.warning("⚠️ Gemini rate limited - using fallback content")
+            return False
+        quota_plan = self.quota_ledger.plan("gemini", self.gemini_credential)
+        if quota_plan != "ok":
+            logger.warning(f"⚠️ Gemini quota {quota_plan} - using fallback content")
+            return False
+        return True
+
+    def _gemini_retry_after_429(self, response, deadline, can_retry=True):
+        """Handle a Gemini 429; returns True when the caller should retry.
+        
+        A daily quota error marks the daily window exhausted. A rate limit is
+        waited out when short enough, otherwise Gemini is paused until it ends.
+        """
+        window, delay = gemini_quota_error(response)
+        if window == "daily":
+            logger.error("❌ Gemini daily quota exceeded")
+            self.quota_ledger.mark_exhausted("gemini", self.gemini_credential, "daily")
+            return False
+        delay = self.retry_delay if delay is None else delay
+        if can_retry and delay <= self.max_retry_after:
+            logger.warning(f"⚠️ Gemini rate limited - retrying in {delay:.0f}s")
+            if deadline.sleep(delay):
+                return True
+        logger.warning(f"⚠️ Gemini rate limited - pausing for {delay:.0f}s")
+        self.gemini_paused_until = time.time() + delay
+        return False
+
+    def generate_seo_content(self, product, deadline=None):
         """Generate SEO-optimized content using Google Gemini with enhanced error handling"""
+        deadline = self._deadline(deadline)
+        if not self._gemini_quota_ok():
+            return self.create_fallback_content(product)
+        
         for attempt in range(self.max_retries):
             try:
                 # Working Gemini API URL with stable model
-                url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key={self.gemini_api_key}"
+                url = self._gemini_url()
                 
                 headers = {
                     'Content-Type': 'application/json',
@@ -458,23 +3078,7 @@ class AmazonAffiliateBlogBot:
                     'x-goog-api-key': self.gemini_api_key
                 }
                 
-                prompt = f"""Create a compelling Amazon affiliate product review for: {product['title']} (Price: {product['price']}, Rating: {product['rating']}/5, {product['reviews']} reviews).
-
-Write an SEO-optimized review including:
-1. Catchy title with power words
-2. Brief meta description (under 150 chars)
-3. Engaging intro highlighting product appeal
-4. Key features and benefits
-5. Pros and cons analysis
-6. Customer review summary
-7. Strong purchase call-to-action
-
-Keep it 600-800 words, natural and trustworthy tone.
-
-Return ONLY valid JSON in this exact format:
-{{"title": "Review title here", "meta_description": "Description here", "content": "Full HTML content here"}}
-
-No extra text, no code blocks, no markdown - just pure JSON."""
+                prompt = build_seo_prompt(product)
                 
                 # Enhanced payload with better safety settings
                 payload = {
@@ -483,59 +3087,33 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                             "text": prompt
                         }]
                     }],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "topK": 40,
-                        "topP": 0.95,
-                        "maxOutputTokens": 2048,
-                        "candidateCount": 1
-                    },
-                    "safetySettings": [
-                        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
-                    ]
+                    "generationConfig": dict(GEMINI_GENERATION_CONFIG, maxOutputTokens=2048),
+                    "safetySettings": GEMINI_SAFETY_SETTINGS
                 }
                 
-                response = requests.post(url, headers=headers, json=payload, timeout=45)
+                started = time.time()
+                response = self.http.post(url, headers=headers, json=payload, timeout=deadline.timeout(45))
+                self.quota_ledger.record("gemini", self.gemini_credential)
                 
                 if response.status_code == 200:
                     result = response.json()
+                    self._record_gemini_usage("single", 1, time.time() - started, result)
                     if 'candidates' in result and len(result['candidates']) > 0:
                         candidate = result['candidates'][0]
                         if 'content' in candidate and 'parts' in candidate['content']:
                             content = candidate['content']['parts'][0]['text'].strip()
                             
-                            # Enhanced JSON extraction and cleaning
                             try:
-                                # Remove code blocks and markdown
-                                content = re.sub(r'```json\s*', '', content)
-                                content = re.sub(r'```\s*', '', content)
-                                content = content.strip()
-                                
-                                # Find JSON boundaries
-                                json_start = content.find('{')
-                                json_end = content.rfind('}') + 1
+                                content_data = parse_ai_json(content)
                                 
-                                if json_start >= 0 and json_end > json_start:
-                                    json_content = content[json_start:json_end]
+                                # Validate required fields
+                                if is_valid_article(content_data):
+                                    logger.info("✅ AI content generated successfully")
+                                    return clean_article(content_data)
+                                else:
+                                    logger.warning("⚠️ AI response missing required fields")
                                     
-                                    # Clean control characters that cause JSON parsing issues
-                                    json_content = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_content)
-                                    json_content = json_content.replace('\n', ' ').replace('\r', ' ')
-                                    json_content = re.sub(r'\s+', ' ', json_content)
-                                    
-                                    content_data = json.loads(json_content)
-                                    
-                                    # Validate required fields
-                                    if all(key in content_data for key in ['title', 'meta_description', 'content']):
-                                        logger.info("✅ AI content generated successfully")
-                                        return content_data
-                                    else:
-                                        logger.warning("⚠️ AI response missing required fields")
-                                        
-                            except json.JSONDecodeError as e:
+                            except ValueError as e:
                                 logger.warning(f"⚠️ Failed to parse AI JSON: {e}")
                                 logger.debug(f"Raw content: {content[:200]}...")
                             
@@ -553,21 +3131,28 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                 elif response.status_code == 403:
                     logger.error(f"❌ Gemini API key issue: {response.text}")
                     break  # Don't retry on auth errors
+                elif response.status_code == 429:
+                    if self._gemini_retry_after_429(response, deadline, attempt < self.max_retries - 1):
+                        continue
+                    break
                 else:
                     logger.error(f"❌ Gemini API error (attempt {attempt + 1}/{self.max_retries}): {response.status_code}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
+                        if not deadline.sleep(self.retry_delay * (attempt + 1)):  # Exponential backoff
+                            break
                         continue
                     
             except requests.exceptions.Timeout:
                 logger.error(f"⏰ Gemini API timeout (attempt {attempt + 1}/{self.max_retries})")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    if not deadline.sleep(self.retry_delay):
+                        break
                     continue
             except requests.exceptions.RequestException as e:
                 logger.error(f"❌ Content generation network error (attempt {attempt + 1}/{self.max_retries}): {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    if not deadline.sleep(self.retry_delay):
+                        break
                     continue
             except Exception as e:
                 logger.error(f"❌ Content generation error: {e}")
@@ -576,97 +3161,161 @@ No extra text, no code blocks, no markdown - just pure JSON."""
         logger.info("📝 Using fallback content generation")
         return self.create_fallback_content(product)
 
-    def create_fallback_content(self, product, ai_content=""):
-        """Create fallback content if AI fails"""
-        title = f"🔥 {product['title']} Review 2024 - Worth the Investment?"
-        
-        # Clean AI content if provided
-        clean_ai_content = ""
-        if ai_content:
-            # Remove potential JSON artifacts and truncate
-            clean_ai_content = re.sub(r'[{}"]', '', ai_content)
-            clean_ai_content = clean_ai_content[:500] + "..." if len(clean_ai_content) > 500 else clean_ai_content
-        
-        content = f"""
-        <div class="product-review">
-            <div class="product-header" style="text-align: center; margin-bottom: 30px;">
-                <img src="{product['image']}" alt="{product['title']}" style="max-width: 400px; width: 100%; height: auto; border-radius: 10px; box-shadow: 0 8px 25px rgba(0,0,0,0.15); margin-bottom: 20px;">
-                <h2 style="color: #2c3e50; margin-bottom: 10px;">🎯 Why {product['title']} is a Top Choice in 2024</h2>
-            </div>
-            
-            <p>Looking for a reliable <strong>{product['title'].lower()}</strong>? You're in the right place! After thorough research and analysis of {product['reviews']:,} customer reviews, we're excited to share our comprehensive evaluation of this highly-rated product.</p>
-            
-            <div class="product-highlight" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 25px; border-radius: 15px; margin: 25px 0; text-align: center;">
-                <h3 style="color: white; margin-bottom: 15px;">⭐ Customer Favorite</h3>
-                <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-top: 20px;">
-                    <div><strong>Rating:</strong> {product['rating']}/5 ⭐</div>
-                    <div><strong>Reviews:</strong> {product['reviews']:,} verified</div>
-                    <div><strong>Price:</strong> {product['price']}</div>
-                </div>
-            </div>
-            
-            <h3>✨ Outstanding Features</h3>
-            <ul style="background: #f8f9fa; padding: 20px; border-radius: 10px;">
-                {chr(10).join(f'<li><strong>{feature}</strong></li>' for feature in product['features'])}
-            </ul>
-            
-            <h3>📊 What Makes This Product Special</h3>
-            <p>With an impressive <strong>{product['rating']}/5 star rating</strong> from over {product['reviews']:,} verified customers, this product has consistently proven its value. Customers frequently mention its exceptional quality, reliability, and outstanding performance.</p>
-            
-            <div class="analysis-grid" style="display: grid; grid-template-columns: 1fr 1fr; gap: 25px; margin: 30px 0;">
-                <div class="pros-section" style="background: #d4edda; padding: 20px; border-radius: 10px; border-left: 4px solid #28a745;">
-                    <h4 style="color: #155724; margin-bottom: 15px;">✅ Major Advantages</h4>
-                    <ul style="color: #155724;">
-                        <li>Superior build quality and durability</li>
-                        <li>Exceptional value for the price point</li>
-                        <li>Amazon Prime fast shipping available</li>
-                        <li>Overwhelmingly positive customer reviews</li>
-                        <li>Reliable performance and functionality</li>
-                    </ul>
-                </div>
-                <div class="considerations" style="background: #f8d7da; padding: 20px; border-radius: 10px; border-left: 4px solid #dc3545;">
-                    <h4 style="color: #721c24; margin-bottom: 15px;">⚠️ Things to Consider</h4>
-                    <ul style="color: #721c24;">
-                        <li>Check size/compatibility requirements</li>
-                        <li>Compare with similar products if needed</li>
-                        <li>Read product specifications carefully</li>
-                        <li>Consider your specific use case</li>
-                    </ul>
-                </div>
-            </div>
-            
-            <h3>💬 Real Customer Feedback</h3>
-            <p>The {product['reviews']:,} customer reviews paint a clear picture: this is a product that delivers on its promises. Customers consistently praise its performance, quality, and value, making it a standout choice in its category.</p>
-            
-            {f'<div class="ai-generated-content" style="margin: 20px 0; padding: 15px; background: #f8f9fa; border-radius: 10px;"><p>{clean_ai_content}</p></div>' if clean_ai_content else ''}
-            
-            <h3>🎯 Our Recommendation</h3>
-            <p>Based on extensive analysis and customer feedback, <strong>{product['title']}</strong> offers exceptional value at {product['price']}. With its {product['rating']}/5 star rating and {product['reviews']:,} satisfied customers, it's a reliable choice you can trust.</p>
-            
-            <div class="urgency-section" style="background: linear-gradient(45deg, #ff6b6b, #ee5a24); color: white; padding: 25px; border-radius: 15px; text-align: center; margin: 30px 0;">
-                <h3 style="color: white; margin-bottom: 15px;">⚡ Don't Wait - Popular Item!</h3>
-                <p style="font-size: 16px; margin-bottom: 20px;">Join thousands of satisfied customers who made the smart choice</p>
-                <div style="font-size: 14px; opacity: 0.9;">
-                    ✅ Fast & Free Shipping • ✅ Easy Returns • ✅ Secure Checkout
-                </div>
-            </div>
-        </div>
+    def request_seo_text(self, product, timeout=45, deadline=None):
+        """Single Gemini attempt returning the raw response text, or None.
+        
+        Used by the offline backfill, which parses and renders in worker processes.
+        """
+        deadline = self._deadline(deadline)
+        if not self._gemini_quota_ok():
+            return None
+        payload = {
+            "contents": [{"parts": [{"text": build_seo_prompt(product)}]}],
+            "generationConfig": dict(GEMINI_GENERATION_CONFIG, maxOutputTokens=2048),
+            "safetySettings": GEMINI_SAFETY_SETTINGS
+        }
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Amazon-Affiliate-Bot/1.0',
+            'x-goog-api-key': self.gemini_api_key
+        }
+        try:
+            started = time.time()
+            response = self.http.post(self._gemini_url(), headers=headers, json=payload, timeout=deadline.timeout(timeout))
+            self.quota_ledger.record("gemini", self.gemini_credential)
+            if response.status_code == 429:
+                self._gemini_retry_after_429(response, deadline, can_retry=False)
+                return None
+            if response.status_code != 200:
+                logger.warning(f"⚠️ Gemini API error: {response.status_code}")
+                return None
+            result = response.json()
+            self._record_gemini_usage("single", 1, time.time() - started, result)
+            return result['candidates'][0]['content']['parts'][0]['text']
+        except (requests.exceptions.RequestException, KeyError, IndexError, ValueError) as e:
+            logger.warning(f"⚠️ Gemini request failed: {e}")
+            return None
+
+    def generate_seo_content_batch(self, products, deadline=None):
+        """Generate content for several products in one Gemini request.
+        
+        Returns one content dict per product, in order. Items that are missing
+        or invalid in the response fall back to create_fallback_content on
+        their own without failing the rest of the batch.
         """
+        deadline = self._deadline(deadline)
+        if len(products) <= 1:
+            return [self.generate_seo_content(product, deadline) for product in products]
+        if not self._gemini_quota_ok():
+            return [self.create_fallback_content(product) for product in products]
         
-        meta_description = f"{product['title']} review: {product['rating']}/5 stars from {product['reviews']:,} customers. Features, pros/cons & best price at {product['price']}."
+        # Shared instructions go first, then one compact line per product
+        item_lines = "\n".join(
+            f"{index}. {product.title} (Price: {product.price}, Rating: {product.rating}/5, {product.reviews} reviews)"
+            for index, product in enumerate(products)
+        )
+        prompt = f"""Create a compelling Amazon affiliate product review for EACH product listed below.
+
+{SEO_INSTRUCTIONS}
+
+Return a JSON array with one object per product, using the product's number as "index".
+
+Products:
+{item_lines}"""
         
-        return {
-            "title": title,
-            "meta_description": meta_description,
-            "content": content
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": dict(
+                GEMINI_GENERATION_CONFIG,
+                maxOutputTokens=min(2048 * len(products), 8192),
+                responseMimeType="application/json",
+                responseSchema=GEMINI_BATCH_RESPONSE_SCHEMA
+            ),
+            "safetySettings": GEMINI_SAFETY_SETTINGS
         }
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Amazon-Affiliate-Bot/1.0',
+            'x-goog-api-key': self.gemini_api_key
+        }
+        
+        items = None
+        for attempt in range(self.max_retries):
+            try:
+                started = time.time()
+                # Structured output (responseSchema) is only served by v1beta
+                response = self.http.post(self._gemini_url("v1beta"), headers=headers, json=payload,
+                                         timeout=deadline.timeout(45 + 15 * len(products)))
+                self.quota_ledger.record("gemini", self.gemini_credential)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    self._record_gemini_usage("batch", len(products), time.time() - started, result)
+                    text = result['candidates'][0]['content']['parts'][0]['text']
+                    items = parse_ai_json(text, container='[')
+                    break
+                elif response.status_code in [400, 403]:
+                    logger.error(f"❌ Gemini batch request rejected: {response.status_code} - {response.text}")
+                    break
+                elif response.status_code == 429:
+                    if self._gemini_retry_after_429(response, deadline, attempt < self.max_retries - 1):
+                        continue
+                    break
+                else:
+                    logger.error(f"❌ Gemini batch API error (attempt {attempt + 1}/{self.max_retries}): {response.status_code}")
+                    
+            except requests.exceptions.RequestException as e:
+                logger.error(f"❌ Gemini batch network error (attempt {attempt + 1}/{self.max_retries}): {e}")
+            except (KeyError, IndexError, ValueError) as e:
+                logger.warning(f"⚠️ Unusable Gemini batch response: {e}")
+                break
+            
+            if attempt < self.max_retries - 1:
+                if not deadline.sleep(self.retry_delay * (attempt + 1)):
+                    break
+        
+        # Index items by the position the model echoed back
+        by_index = {}
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and isinstance(item.get('index'), int):
+                by_index.setdefault(item['index'], item)
+        
+        contents = []
+        ai_items = 0
+        for index, product in enumerate(products):
+            item = by_index.get(index)
+            if is_valid_article(item):
+                contents.append(clean_article(item))
+                ai_items += 1
+            else:
+                logger.warning(f"⚠️ Batch item {index} missing or invalid - using fallback content")
+                contents.append(self.create_fallback_content(product))
+        
+        logger.info(f"✅ Batch generation: {ai_items}/{len(products)} items from AI")
+        return contents
+
+    def create_fallback_content(self, product, ai_content=""):
+        """Create fallback content if AI fails"""
+        return render_fallback_content(product, ai_content)
 
-    def post_to_blogger(self, title, content, meta_description, affiliate_link):
+    def post_to_blogger(self, title, content, meta_description, affiliate_link, asin=None, deadline=None, facts=None):
         """Post content to Blogger using API with improved authentication retry"""
+        deadline = self._deadline(deadline)
+        # Render the post once - retries reuse the same body instead of rebuilding the HTML
+        post_data = {
+            'title': title,
+            'content': render_post_html(title, content, affiliate_link, asin, facts),
+            'labels': ['amazon', 'affiliate', 'review', 'deals', '2024', 'shopping', 'products']
+        }
+        
         for attempt in range(self.max_retries):
             try:
                 # Get fresh access token for each attempt
-                access_token = self.get_access_token()
+                access_token = self.get_access_token(deadline)
                 
                 if not access_token:
                     logger.error("❌ No valid access token available for posting")
@@ -682,85 +3331,19 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                     'User-Agent': 'Amazon-Affiliate-Bot/1.0'
                 }
                 
-                # Create complete blog post with affiliate integration
-                formatted_content = f"""
-                <div class="affiliate-product-review" style="max-width: 800px; margin: 0 auto; font-family: Arial, sans-serif;">
-                    {content}
-                    
-                    <div class="cta-section" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 20px; text-align: center; margin: 40px 0; box-shadow: 0 15px 35px rgba(0,0,0,0.1);">
-                        <h3 style="color: white; margin-bottom: 20px; font-size: 28px; font-weight: bold;">🎯 Ready to Get Yours?</h3>
-                        <p style="font-size: 18px; margin-bottom: 25px; opacity: 0.95;">Click below for the best price and fast delivery!</p>
-                        
-                        <a href="{affiliate_link}" target="_blank" rel="nofollow sponsored" style="background: white; color: #667eea; padding: 20px 50px; text-decoration: none; border-radius: 50px; font-weight: bold; font-size: 20px; display: inline-block; transition: all 0.3s; box-shadow: 0 8px 25px rgba(0,0,0,0.2); text-transform: uppercase; letter-spacing: 1px;">
-                            🛒 Check Price on Amazon →
-                        </a>
-                        
-                        <div style="margin-top: 25px; font-size: 13px; opacity: 0.85; line-height: 1.4;">
-                            <p>✅ Prime Shipping Available | ✅ 30-Day Returns | ✅ Secure Payment</p>
-                            <p style="margin-top: 15px; font-size: 11px; opacity: 0.7;">*As Amazon Associates, we earn from qualifying purchases. Prices subject to change.</p>
-                        </div>
-                    </div>
-                    
-                    <div class="trust-signals" style="background: #f8f9fa; padding: 25px; border-radius: 15px; margin: 30px 0; border: 1px solid #e9ecef;">
-                        <h4 style="text-align: center; color: #495057; margin-bottom: 20px;">🏆 Why Choose This Product?</h4>
-                        <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; text-align: center;">
-                            <div>
-                                <div style="font-size: 24px; margin-bottom: 10px;">⭐</div>
-                                <strong>Top Rated</strong><br>
-                                <small>Thousands of 5-star reviews</small>
-                            </div>
-                            <div>
-                                <div style="font-size: 24px; margin-bottom: 10px;">🚚</div>
-                                <strong>Fast Shipping</strong><br>
-                                <small>Amazon Prime eligible</small>
-                            </div>
-                            <div>
-                                <div style="font-size: 24px; margin-bottom: 10px;">🔒</div>
-                                <strong>Secure Purchase</strong><br>
-                                <small>Amazon buyer protection</small>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                
-                <script type="application/ld+json">
-                {{
-                    "@context": "https://schema.org/",
-                    "@type": "Review",
-                    "itemReviewed": {{
-                        "@type": "Product",
-                        "name": "{title.replace('"', '\\"')}"
-                    }},
-                    "reviewRating": {{
-                        "@type": "Rating",
-                        "ratingValue": "4.5",
-                        "bestRating": "5"
-                    }},
-                    "author": {{
-                        "@type": "Organization",
-                        "name": "Fresh Finds Store"
-                    }}
-                }}
-                </script>
-                """
-                
-                # Prepare the blog post data
-                post_data = {
-                    'title': title,
-                    'content': formatted_content,
-                    'labels': ['amazon', 'affiliate', 'review', 'deals', '2024', 'shopping', 'products']
-                }
-                
                 # Post to Blogger
-                url = f"https://www.googleapis.com/blogger/v3/blogs/{self.blogger_id}/posts"
+                url = f"{self.blogger_api_base}/blogs/{self.blogger_id}/posts"
                 logger.info(f"🔄 Posting to Blogger (attempt {attempt + 1}/{self.max_retries})...")
                 
-                response = requests.post(url, headers=headers, json=post_data, timeout=30)
+                response = self.http.post(url, headers=headers, json=post_data, timeout=deadline.timeout(30))
                 
                 if response.status_code == 200:
                     post_data_response = response.json()
                     post_url = post_data_response.get('url', '')
                     logger.info(f"✅ Successfully posted to Blogger: {post_url}")
+                    self.blogger_verified_at = time.time()
+                    if 'id' in post_data_response:
+                        self.post_archive.upsert([dict(post_data_response, asin=asin, facts=facts)])
                     return True
                 elif response.status_code == 401:
                     logger.warning(f"⚠️ Authentication failed (attempt {attempt + 1}/{self.max_retries})")
@@ -777,7 +3360,8 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                     
                     # For refresh tokens, try again
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        if not deadline.sleep(self.retry_delay):
+                            break
                         continue
                 elif response.status_code == 403:
                     logger.error(f"❌ Permission denied: {response.status_code}")
@@ -788,14 +3372,16 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                     logger.error(f"❌ Blogger API error: {response.status_code}")
                     logger.error(f"Response: {response.text}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        if not deadline.sleep(self.retry_delay):
+                            break
                         continue
                     return False
                     
             except requests.exceptions.RequestException as e:
                 logger.error(f"❌ Network error posting to Blogger (attempt {attempt + 1}/{self.max_retries}): {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    if not deadline.sleep(self.retry_delay):
+                        break
                     continue
             except Exception as e:
                 logger.error(f"❌ Error posting to Blogger: {e}")
@@ -804,8 +3390,210 @@ No extra text, no code blocks, no markdown - just pure JSON."""
         logger.error("❌ All posting attempts failed")
         return False
 
+    def sync_post_archive(self, max_pages=50, deadline=None):
+        """Pull posts changed since the last sync into the local archive.
+        
+        Pages are fetched newest-updated first and paging stops at the stored
+        'updated' cursor. The first page is requested with If-None-Match, so an
+        unchanged blog costs a single 304. The cursor only moves once paging
+        reaches it or the last page; a sync cut short by an error, the deadline
+        or max_pages saves its page token and the next sync carries on from it.
+        """
+        deadline = self._deadline(deadline)
+        access_token = self.get_access_token(deadline)
+        if not access_token:
+            return 0
+        
+        url = f"{self.blogger_api_base}/blogs/{self.blogger_id}/posts"
+        cursor = float(self.post_archive.get_state('updated_cursor', '0'))
+        resume = json.loads(self.post_archive.get_state('sync_resume') or '{}')
+        page_token = resume.get('page_token')
+        newest = max(cursor, resume.get('newest', 0))
+        first_page_etag = None
+        complete = False
+        synced = 0
+        
+        try:
+            for page in range(max_pages):
+                headers = {
+                    'Authorization': f'Bearer {access_token}',
+                    'User-Agent': 'Amazon-Affiliate-Bot/1.0'
+                }
+                etag = self.post_archive.get_state('first_page_etag')
+                if page_token is None and etag:
+                    headers['If-None-Match'] = etag
+                params = {
+                    'orderBy': 'updated',
+                    'fetchBodies': 'true',
+                    'maxResults': 20,
+                    'status': 'live',
+                    'fields': 'nextPageToken,items(id,url,title,labels,published,updated,content)'
+                }
+                if page_token:
+                    params['pageToken'] = page_token
+                
+                response = self.http.get(url, headers=headers, params=params, timeout=deadline.timeout(30))
+                if response.status_code == 304:
+                    logger.info("🗄️ Post archive up to date (304)")
+                    return 0
+                if response.status_code != 200:
+                    logger.warning(f"⚠️ Post archive sync failed: {response.status_code}")
+                    if response.status_code == 400 and page == 0 and page_token:
+                        # The saved page token is no longer accepted; start over from the top
+                        logger.warning("⚠️ Post archive resume token rejected, restarting the sync")
+                        self.post_archive.set_state('sync_resume', '')
+                        page_token = None
+                    break
+                if page_token is None and response.headers.get('ETag'):
+                    first_page_etag = response.headers['ETag']
+                
+                data = response.json()
+                items = data.get('items', [])
+                fresh = [item for item in items if (parse_rfc3339(item.get('updated')) or 0) > cursor]
+                if fresh:
+                    self.post_archive.upsert(fresh)
+                    synced += len(fresh)
+                    newest = max(newest, max(parse_rfc3339(item.get('updated')) or 0 for item in fresh))
+                
+                next_page_token = data.get('nextPageToken')
+                # Results are ordered by 'updated', so older pages hold nothing new
+                if not next_page_token or len(fresh) < len(items):
+                    complete = True
+                    break
+                page_token = next_page_token
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"⚠️ Post archive sync network error: {e}")
+        
+        if complete:
+            if newest > cursor:
+                self.post_archive.set_state('updated_cursor', repr(newest))
+            if first_page_etag:
+                self.post_archive.set_state('first_page_etag', first_page_etag)
+            self.post_archive.set_state('sync_resume', '')
+        elif page_token:
+            # page_token is the first page not yet fetched
+            self.post_archive.set_state('sync_resume', json.dumps({"page_token": page_token, "newest": newest}))
+            logger.info("🗄️ Post archive sync incomplete, will resume from the saved page")
+        for asin, published in self.post_archive.latest_by_asin.items():
+            self.scorer.seed_post_time(asin, published)
+        logger.info(f"🗄️ Post archive synced {synced} post(s), {self.post_archive.count()} archived")
+        return synced
+
+    def update_posts(self, facts_by_asin, deadline=None, batch_size=50, dry_run=False):
+        """Patch archived posts whose published facts differ from facts_by_asin.
+        
+        The comparison runs locally against the facts snapshot stored per post,
+        so unchanged posts cost no requests. A changed post is fetched, its
+        marked spans are rewritten and only the content field is PATCHed, with
+        If-Match so edits made in between are not overwritten. Requests are
+        paced to post_update_rate and sent in batches of batch_size posts.
+        """
+        deadline = self._deadline(deadline)
+        stats = {"checked": 0, "unchanged": 0, "unknown": 0, "changed": 0,
+                 "patched": 0, "no_markers": 0, "conflicts": 0, "failed": 0}
+        changed = []
+        for post_id, asin, published_facts in self.post_archive.fact_snapshots():
+            stats["checked"] += 1
+            facts = facts_by_asin.get(asin)
+            if facts is None:
+                stats["unknown"] += 1
+            elif facts_json(facts) == published_facts:
+                stats["unchanged"] += 1
+            else:
+                changed.append((post_id, facts))
+        stats["changed"] = len(changed)
+        logger.info(f"🔁 Post update check: {stats['checked']} posts, {len(changed)} with changed facts")
+        if dry_run or not changed:
+            return stats
+        
+        pacing = {"next_request": time.monotonic()}
+        for start in range(0, len(changed), batch_size):
+            access_token = self.get_access_token(deadline)
+            if not access_token:
+                break
+            for post_id, facts in changed[start:start + batch_size]:
+                if self.quota_ledger.plan("blogger_updates", self.blogger_credential) == "exhausted":
+                    logger.warning("⚠️ Blogger update quota exhausted - remaining posts wait for the next run")
+                    return stats
+                try:
+                    stats[self._patch_post_facts(post_id, facts, access_token, pacing, deadline)] += 1
+                except DeadlineExceeded:
+                    return stats
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"⚠️ Post update network error for {post_id}: {e}")
+                    stats["failed"] += 1
+            logger.info(f"🔁 Post updates: {stats['patched']} patched, {stats['no_markers']} without changes, "
+                        f"{stats['conflicts']} conflicts, {stats['failed']} failed")
+        return stats
+
+    def _paced_request(self, method, url, pacing, deadline, **kwargs):
+        """Send one Blogger update request, spaced out to post_update_rate"""
+        wait = pacing["next_request"] - time.monotonic()
+        if wait > 0 and not deadline.sleep(wait):
+            raise DeadlineExceeded("post update window ended")
+        pacing["next_request"] = max(pacing["next_request"], time.monotonic()) + 1 / self.post_update_rate
+        response = self.http.request(method, url, timeout=deadline.timeout(30), **kwargs)
+        self.quota_ledger.record("blogger_updates", self.blogger_credential)
+        return response
+
+    def _patch_post_facts(self, post_id, facts, access_token, pacing, deadline):
+        """Bring one post's marked facts up to date; returns the stats bucket"""
+        url = f"{self.blogger_api_base}/blogs/{self.blogger_id}/posts/{post_id}"
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'User-Agent': 'Amazon-Affiliate-Bot/1.0'
+        }
+        response = self._paced_request('GET', url, pacing, deadline, headers=headers,
+                                       params={'fields': 'id,etag,content'})
+        if response.status_code != 200:
+            logger.warning(f"⚠️ Could not fetch post {post_id}: {response.status_code}")
+            return "failed"
+        post = response.json()
+        content, names = patch_fact_spans(post.get('content', ''), facts)
+        if not names:
+            # Already current, or an older post without marked facts
+            self.post_archive.set_facts(post_id, facts)
+            return "no_markers"
+        
+        headers['Content-Type'] = 'application/json'
+        if post.get('etag'):
+            headers['If-Match'] = post['etag']
+        response = self._paced_request('PATCH', url, pacing, deadline, headers=headers, json={'content': content})
+        if response.status_code == 200:
+            self.post_archive.set_facts(post_id, facts)
+            logger.info(f"✅ Updated {', '.join(sorted(names))} in post {post_id}")
+            return "patched"
+        if response.status_code == 412:
+            logger.info(f"↪️ Post {post_id} changed since it was fetched - retrying next run")
+            return "conflicts"
+        logger.warning(f"⚠️ Post {post_id} update failed: {response.status_code} - {response.text[:200]}")
+        return "failed"
+
+    def post_update_loop(self):
+        """Re-check published facts against the product facts feed in the background"""
+        logger.info(f"🔁 Post updater started ({self.product_facts_path})")
+        while self.wait_for_leadership():
+            try:
+                self.update_posts(load_product_facts(self.product_facts_path))
+            except Exception as e:
+                logger.error(f"❌ Post update error: {e}")
+            self.shutdown_event.wait(self.post_update_interval)
+
     def process_and_post_product(self):
         """Main function to process and post a product"""
+        started = time.perf_counter()
+        # Config changes wait for the cycle to finish rather than landing mid-cycle
+        with self.cycle_lock:
+            success = self._process_and_post_product()
+            if self.coordinator is not None:
+                # A claim still held here belongs to a product that wasn't published
+                self.coordinator.release_claims()
+        if hasattr(self.http, 'mark_cycle'):
+            self.http.mark_cycle(time.perf_counter() - started, success)
+        return success
+
+    def _process_and_post_product(self):
+        """Run one posting cycle; returns True if a post was published"""
         try:
             logger.info("🔄 Starting new product processing cycle...")
             
@@ -814,54 +3602,104 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                 logger.info("🛑 Shutdown requested, stopping product processing")
                 return False
             
-            # Get trending products
-            products = self.get_trending_products()
-            if not products:
-                logger.warning("⚠️ No products retrieved, skipping cycle")
-                return False
+            # Every upstream call below shares this cycle's budget; everything
+            # before the Blogger call must leave post_reserve seconds for it
+            deadline = Deadline(self.cycle_budget, self.shutdown_event, timeout_scale=self.timeout_scale)
+            preparation = deadline.within(reserve=self.post_reserve)
             
-            # Select a random product
-            product = random.choice(products)
+            # Refresh the local post archive (a single 304 when nothing changed)
+            try:
+                self.publisher.sync(deadline=preparation.within(60))
+            except Exception as e:
+                logger.warning(f"⚠️ Post archive sync skipped: {e}")
             
-            # Check if already posted (basic duplicate prevention)
-            product_hash = hashlib.md5(product['title'].encode()).hexdigest()
-            if product_hash in self.posted_products:
-                logger.info("📝 Product already posted recently, selecting another...")
-                # Try another product
-                available_products = [p for p in products if hashlib.md5(p['title'].encode()).hexdigest() not in self.posted_products]
-                if available_products:
-                    product = random.choice(available_products)
-                    product_hash = hashlib.md5(product['title'].encode()).hexdigest()
-                else:
+            # Content generated by an earlier batch request is posted first
+            product, content_data = self._next_queued_content()
+            
+            if product is None:
+                # Get trending products
+                products = self.get_trending_products(preparation)
+                if not products:
+                    logger.warning("⚠️ No products retrieved, skipping cycle")
+                    return False
+                
+                # Keep the best-scoring products that haven't been posted recently
+                recent_cutoff = time.time() - self.repost_cooldown
+                available_products = [p for p in products
+                                      if hashlib.md5(p.title.encode()).hexdigest() not in self.posted_products
+                                      and not self.recently_posted(p.asin)]
+                if not available_products:
                     logger.info("All products recently posted, clearing history...")
                     self.posted_products.clear()
+                    # Least recently posted first, so the same product isn't posted twice in a row
+                    available_products = sorted(products, key=lambda p: self.scorer.last_posted(p.asin))
+                if self.coordinator is not None:
+                    # Work only on a product no other instance has claimed or just published
+                    published_elsewhere = self.coordinator.published_since(recent_cutoff)
+                    available_products = [p for p in available_products if p.asin not in published_elsewhere]
+                    claimed = next((p for p in available_products
+                                    if self.coordinator.claim_product(p.asin, self.repost_cooldown)), None)
+                    if claimed is None:
+                        logger.info("🤝 Every candidate is claimed by another instance, skipping cycle")
+                        return False
+                    available_products = [claimed] + [p for p in available_products if p is not claimed]
+                product = available_products[0]
+            
+            product_hash = hashlib.md5(product.title.encode()).hexdigest()
             
             # Generate affiliate link
-            affiliate_url = self.create_affiliate_link(product['asin'])
-            short_url = self.shorten_url(affiliate_url)
+            affiliate_url = self.create_affiliate_link(product.asin)
+            short_url = self.shorten_url(affiliate_url, preparation)
+            if short_url != affiliate_url:
+                self.click_analytics.register_links([(short_url, affiliate_url, product.asin, product.category, time.time())])
             
             # Generate SEO content
-            logger.info(f"✍️ Generating content for: {product['title'][:50]}...")
-            content_data = self.generate_seo_content(product)
+            if content_data is None:
+                logger.info(f"✍️ Generating content for: {product.title[:50]}...")
+                if self.gemini_batch_size > 1:
+                    # One request covers this cycle and the next few; the extra
+                    # articles are queued for later cycles
+                    unique = {}
+                    for candidate in available_products:
+                        unique.setdefault(candidate.asin, candidate)
+                    batch = list(unique.values())[:self.gemini_batch_size]
+                    contents = self.generate_seo_content_batch(batch, preparation)
+                    content_data = contents[0]
+                    self.content_queue.extend(zip(batch[1:], contents[1:]))
+                else:
+                    content_data = self.generate_seo_content(product, preparation)
+            else:
+                logger.info(f"📦 Using queued content for: {product.title[:50]}...")
             
             if not content_data:
                 logger.error("❌ Failed to generate content")
                 return False
             
-            # Post to Blogger
-            logger.info("📤 Posting to Blogger...")
-            success = self.post_to_blogger(
+            if deadline.expired():
+                # Keep the article for the next cycle rather than dropping it
+                self.content_queue.insert(0, (product, content_data))
+                logger.warning("⏱️ Cycle budget or shutdown reached before posting - content queued")
+                return False
+            
+            # Publish through the configured backend
+            logger.info(f"📤 Publishing via {self.publisher.name}...")
+            success = self.publisher.publish(
                 content_data['title'],
                 content_data['content'],
                 content_data['meta_description'],
-                short_url
+                short_url,
+                product,
+                deadline=deadline
             )
             
             if success:
                 self.posted_products.add(product_hash)
-                logger.info(f"🎉 Successfully posted: {product['title'][:50]}...")
+                self.scorer.record_post(product.asin, product.category)
+                if self.coordinator is not None:
+                    self.coordinator.record_published(product.asin)
+                logger.info(f"🎉 Successfully posted: {product.title[:50]}...")
                 logger.info(f"💰 Affiliate link: {short_url}")
-                logger.info(f"🖼️ Product image: {product['image']}")
+                logger.info(f"🖼️ Product image: {product.image}")
                 
                 # Clean old posted products (keep last 50)
                 if len(self.posted_products) > 50:
@@ -878,6 +3716,23 @@ No extra text, no code blocks, no markdown - just pure JSON."""
             traceback.print_exc()
             return False
 
+    def recently_posted(self, asin):
+        """True if the ASIN was published within repost_cooldown, per the archive or this process"""
+        cutoff = time.time() - self.repost_cooldown
+        return self.post_archive.posted_since(asin, cutoff) or self.scorer.last_posted(asin) >= cutoff
+
+    def _next_queued_content(self):
+        """Pop the next queued (product, content) pair that hasn't been posted yet"""
+        while self.content_queue:
+            product, content_data = self.content_queue.pop(0)
+            if self.recently_posted(product.asin):
+                logger.info(f"⏭️ Dropping queued article for {product.asin}: posted within the repost cooldown")
+                continue
+            if hashlib.md5(product.title.encode()).hexdigest() not in self.posted_products and (
+                    self.coordinator is None or self.coordinator.claim_product(product.asin, self.repost_cooldown)):
+                return product, content_data
+        return None, None
+
     def wait_with_shutdown_check(self, total_seconds, log_interval=900):
         """Wait for specified time while checking for shutdown signal"""
         elapsed = 0
@@ -897,6 +3752,23 @@ No extra text, no code blocks, no markdown - just pure JSON."""
         
         return self.shutdown_event.is_set()
 
+    def wait_until_next_post(self, log_interval=900):
+        """Wait until next_post_at, which a config reload may move; True on shutdown"""
+        last_log = time.time()
+        while not self.shutdown_event.is_set():
+            remaining = self.next_post_at - time.time()
+            if remaining <= 0:
+                break
+            if self.shutdown_event.wait(min(60, remaining)):
+                logger.info("🛑 Shutdown signal received during wait")
+                return True  # Shutdown requested
+            
+            if time.time() - last_log >= log_interval and self.next_post_at > time.time():
+                last_log = time.time()
+                logger.info(f"⏳ {(self.next_post_at - time.time()) // 60:.0f} minutes remaining until next post...")
+        
+        return self.shutdown_event.is_set()
+
     def run_bot(self):
         """Main bot execution loop with improved error handling"""
         logger.info("🚀 Amazon Affiliate Bot starting...")
@@ -905,27 +3777,8 @@ No extra text, no code blocks, no markdown - just pure JSON."""
         # Setup signal handlers for graceful shutdown
         self.setup_signal_handlers()
         
-        # Run diagnostics
-        self.diagnose_authentication()
-        
-        if not self.refresh_token:
-            logger.error("❌ GOOGLE_OAUTH_TOKEN environment variable not set!")
-            logger.error("Please set your token in Render environment variables")
-            logger.error("The bot will continue but posting will fail without proper authentication")
-            return False
-        
-        # Test Blogger access
-        logger.info("🧪 Testing Blogger API access...")
-        if self.test_blogger_access():
-            logger.info("✅ Authentication working correctly - ready to post!")
-        else:
-            logger.error("❌ Authentication test failed - please check your token")
-            if self.token_type == 'access':
-                logger.error("💡 Tip: Make sure you're using an ACCESS TOKEN starting with 'ya29.'")
-                logger.error("💡 Access tokens expire - you may need a fresh one")
-            elif self.token_type == 'refresh':
-                logger.error("💡 Tip: Check your GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET")
-                logger.error("💡 Refresh tokens require proper client credentials")
+        # Make sure the publishing backend is usable before scheduling posts
+        if not self.publisher.check_ready():
             return False
         
         # Start keep-alive thread
@@ -933,50 +3786,84 @@ No extra text, no code blocks, no markdown - just pure JSON."""
         keep_alive_thread.start()
         logger.info("💓 Keep-alive thread started")
         
-        # Post immediately on startup
-        logger.info("🎬 Creating first post immediately...")
-        first_post_success = self.process_and_post_product()
+        # Start memory sampling when diagnostics are enabled
+        if self.memory_monitor is not None:
+            Thread(target=self.memory_monitor.run, args=(self.shutdown_event,), daemon=True).start()
+        
+        # Start background click ingestion
+        Thread(target=self.click_ingestion_loop, daemon=True).start()
+        
+        # Start background ASIN validation
+        Thread(target=self.asin_validation_loop, daemon=True).start()
+        
+        # Start in-place post updates when a product facts feed is configured
+        if self.product_facts_path and self.publisher.name == 'blogger':
+            Thread(target=self.post_update_loop, daemon=True).start()
+        
+        # Watch the config file for changes
+        if self.config_path:
+            Thread(target=self.config_watch_loop, daemon=True).start()
+        
+        # Heartbeats keep this instance's leases alive while it runs
+        if self.coordinator is not None:
+            Thread(target=self.coordinator.run, args=(self.shutdown_event,), daemon=True).start()
+            logger.info(f"🤝 Coordinating as {self.coordinator.instance_id} with "
+                        f"{len(self.coordinator.alive_instances())} live instance(s)")
         
-        if not first_post_success:
-            logger.warning("⚠️ First post failed, but continuing with scheduled posts...")
+        # Start periodic state snapshots
+        Thread(target=self.snapshot_loop, daemon=True).start()
+        
+        if self.next_post_at > time.time():
+            # Restored mid-interval: keep the schedule instead of posting again now
+            logger.info(f"♻️ Resuming schedule - next post in {(self.next_post_at - time.time()) / 60:.0f} minutes")
+        else:
+            # Post immediately on startup
+            logger.info("🎬 Creating first post immediately...")
+            self.post_count += 1
+            first_post_success = self.process_and_post_product()
+            
+            if not first_post_success:
+                logger.warning("⚠️ First post failed, but continuing with scheduled posts...")
+            self.next_post_at = time.time() + self.post_interval
+            self.save_snapshot()
         
         # Main posting loop
-        post_count = 1
-        consecutive_failures = 0
         max_consecutive_failures = 5
         
         while not self.shutdown_event.is_set():
             try:
-                # Wait 1 hour before next post (3600 seconds)
-                logger.info(f"⏰ Waiting 60 minutes for next post (#{post_count + 1})...")
+                # Wait post_interval before the next post
+                logger.info(f"⏰ Waiting {max(0, self.next_post_at - time.time()) / 60:.0f} minutes for next post (#{self.post_count + 1})...")
                 
-                # Use improved wait function that can be interrupted
-                shutdown_requested = self.wait_with_shutdown_check(3600, 900)  # Log every 15 minutes
+                # Interruptible wait that follows interval changes from the config
+                shutdown_requested = self.wait_until_next_post(900)  # Log every 15 minutes
                 
                 if shutdown_requested:
                     logger.info("🛑 Shutdown requested, exiting main loop")
                     break
                 
                 # Process and post next product
-                post_count += 1
-                logger.info(f"🔄 Starting post #{post_count}")
+                self.post_count += 1
+                logger.info(f"🔄 Starting post #{self.post_count}")
                 
                 success = self.process_and_post_product()
+                self.next_post_at = time.time() + self.post_interval
                 
                 if success:
-                    consecutive_failures = 0
-                    logger.info(f"✅ Post #{post_count} completed successfully")
+                    self.consecutive_failures = 0
+                    logger.info(f"✅ Post #{self.post_count} completed successfully")
                 else:
-                    consecutive_failures += 1
-                    logger.warning(f"❌ Post #{post_count} failed (consecutive failures: {consecutive_failures})")
-                    
-                    # If too many consecutive failures, wait longer before retrying
-                    if consecutive_failures >= max_consecutive_failures:
-                        logger.error(f"❌ Too many consecutive failures ({consecutive_failures}). Waiting 30 minutes before retry...")
-                        shutdown_requested = self.wait_with_shutdown_check(1800, 300)  # 30 minutes
-                        if shutdown_requested:
-                            break
-                        consecutive_failures = 0  # Reset after extended wait
+                    self.consecutive_failures += 1
+                    logger.warning(f"❌ Post #{self.post_count} failed (consecutive failures: {self.consecutive_failures})")
+                self.save_snapshot()
+                
+                # If too many consecutive failures, wait longer before retrying
+                if not success and self.consecutive_failures >= max_consecutive_failures:
+                    logger.error(f"❌ Too many consecutive failures ({self.consecutive_failures}). Waiting 30 minutes before retry...")
+                    shutdown_requested = self.wait_with_shutdown_check(1800, 300)  # 30 minutes
+                    if shutdown_requested:
+                        break
+                    self.consecutive_failures = 0  # Reset after extended wait
                 
             except KeyboardInterrupt:
                 logger.info("🛑 Bot stopped by user (Ctrl+C)")
@@ -987,8 +3874,8 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                 import traceback
                 traceback.print_exc()
                 
-                consecutive_failures += 1
-                if consecutive_failures >= max_consecutive_failures:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= max_consecutive_failures:
                     logger.error("❌ Too many consecutive errors. Shutting down bot.")
                     break
                 
@@ -998,6 +3885,10 @@ No extra text, no code blocks, no markdown - just pure JSON."""
                     break
         
         logger.info("🏁 Bot shutting down gracefully...")
+        if self.coordinator is not None:
+            self.coordinator.close()
+        if self.save_snapshot():
+            logger.info(f"💾 State saved to {self.snapshot_path}")
         return True
 
 def run_health_server():
@@ -1009,9 +3900,277 @@ def run_health_server():
     except Exception as e:
         logger.error(f"❌ Health server error: {e}")
 
+def render_backfill_article(item):
+    """Process-pool worker: clean the AI JSON (if any) and render the full post HTML"""
+    index, product, ai_text = item
+    source = "fallback"
+    content_data = None
+    if ai_text:
+        try:
+            content_data = parse_ai_json(ai_text)
+        except ValueError:
+            content_data = None
+        if is_valid_article(content_data):
+            content_data = clean_article(content_data)
+            source = "gemini"
+        else:
+            content_data = render_fallback_content(product, ai_text)
+    if content_data is None:
+        content_data = render_fallback_content(product)
+    
+    affiliate_link = product.affiliate_link
+    return {
+        "index": index,
+        "asin": product.asin,
+        "category": product.category,
+        "title": content_data['title'],
+        "meta_description": content_data['meta_description'],
+        "affiliate_link": affiliate_link,
+        "html": render_post_html(content_data['title'], content_data['content'], affiliate_link, product.asin,
+                                 product_facts(product)),
+        "source": source
+    }
+
+class BackfillArchive:
+    """Append-only article output (JSONL or SQLite) with a resumable checkpoint file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint.json"
+        self.use_sqlite = path.endswith(('.sqlite', '.sqlite3', '.db'))
+        self.conn = None
+        self.handle = None
+
+    def load_checkpoint(self):
+        """Return the saved checkpoint, or None when starting fresh"""
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def open(self, checkpoint=None):
+        """Open the output, discarding anything written after the checkpoint"""
+        if self.use_sqlite:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    idx INTEGER PRIMARY KEY,
+                    asin TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    meta_description TEXT NOT NULL,
+                    affiliate_link TEXT NOT NULL,
+                    html TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("DELETE FROM articles WHERE idx >= ?", ((checkpoint or {}).get("next_index", 0),))
+            self.conn.commit()
+        else:
+            self.handle = open(self.path, 'a+b' if checkpoint else 'wb')
+            if checkpoint:
+                self.handle.truncate(checkpoint.get("offset", 0))
+            self.handle.seek(0, os.SEEK_END)
+
+    def write(self, articles):
+        """Durably append a chunk of rendered articles"""
+        now = time.time()
+        if self.use_sqlite:
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(a['index'], a['asin'], a['category'], a['title'], a['meta_description'],
+                       a['affiliate_link'], a['html'], a['source'], now) for a in articles])
+        else:
+            self.handle.write(b''.join(json.dumps(dict(a, created_at=now)).encode() + b'\n' for a in articles))
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+
+    def save_checkpoint(self, next_index, total, seed):
+        """Atomically record progress once a chunk is safely written"""
+        checkpoint = {
+            "next_index": next_index,
+            "total": total,
+            "seed": seed,
+            "offset": self.handle.tell() if self.handle else None,
+            "updated_at": time.time()
+        }
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+        if self.handle:
+            self.handle.close()
+
+def run_backfill(args):
+    """Pre-build articles offline across a process pool, streaming them to a local archive"""
+    bot = AmazonAffiliateBlogBot()
+    archive = BackfillArchive(args.output)
+    checkpoint = archive.load_checkpoint() if args.resume else None
+    if checkpoint and checkpoint.get("seed") != args.seed:
+        logger.error("❌ Checkpoint was written with a different --seed; refusing to resume")
+        return 1
+    start_index = checkpoint["next_index"] if checkpoint else 0
+    archive.open(checkpoint)
+    
+    unavailable = bot.asin_validator.unavailable_asins
+    catalog = [(category, asin) for category in bot.trending_categories
+               for asin in bot.real_asins_by_category.get(category, []) if asin not in unavailable]
+    
+    def product_for(index):
+        # Seeded per index so a resumed run rebuilds exactly the same products
+        rng = random.Random(args.seed * 1_000_003 + index)
+        category, asin = catalog[index % len(catalog)]
+        product = bot.build_product(asin, category, resolve_image=False, rng=rng)
+        product.image = f"https://m.media-amazon.com/images/I/{asin}.jpg"
+        product.affiliate_link = bot.create_affiliate_link(asin)
+        return product
+    
+    workers = args.workers or os.cpu_count() or 1
+    logger.info(f"🏗️ Backfilling articles {start_index}..{args.count - 1} with {workers} worker process(es) "
+                f"({'Gemini + fallback' if args.use_gemini else 'fallback only'}) -> {args.output}")
+    
+    written = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_start in range(start_index, args.count, args.chunk):
+                chunk_end = min(chunk_start + args.chunk, args.count)
+                items = []
+                for index in range(chunk_start, chunk_end):
+                    product = product_for(index)
+                    ai_text = bot.request_seo_text(product) if args.use_gemini else None
+                    items.append((index, product, ai_text))
+                
+                articles = list(pool.map(render_backfill_article, items,
+                                         chunksize=max(1, len(items) // (workers * 4))))
+                archive.write(articles)
+                archive.save_checkpoint(chunk_end, args.count, args.seed)
+                written += len(articles)
+                
+                elapsed = time.perf_counter() - started
+                logger.info(f"📦 {chunk_end}/{args.count} articles ({written / elapsed:.0f}/sec)")
+    except KeyboardInterrupt:
+        logger.info("🛑 Backfill interrupted - rerun with --resume to continue")
+    finally:
+        archive.close()
+    
+    elapsed = time.perf_counter() - started
+    rate = written / elapsed if elapsed else 0
+    logger.info(f"📊 Backfill wrote {written} articles in {elapsed:.2f}s: "
+                f"{rate:.1f} articles/sec, {rate / workers:.1f} articles/sec per core ({workers} cores)")
+    return 0
+
+def run_replay(args):
+    """Replay recorded cycles offline and compare their latency with the recording"""
+    os.environ['BOT_HTTP_MODE'] = 'replay'
+    os.environ['BOT_CASSETTE'] = args.cassette
+    os.environ['BOT_REPLAY_LATENCY_SCALE'] = str(args.scale)
+    # Quota counters and caches from a replay must not leak into the real data dir
+    os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-replay-')
+    random.seed(args.seed)
+    
+    bot = AmazonAffiliateBlogBot()
+    bot.scorer.rng = np.random.default_rng(args.seed)
+    
+    # Recreate the recorded credential shape; the real secrets were redacted
+    bot.token_type = bot.http.metadata.get("token_type") or 'access'
+    bot.refresh_token = bot.client_id = bot.client_secret = 'REDACTED'
+    if bot.token_type == 'access':
+        bot.access_token = 'REDACTED'
+        bot.token_expires_at = time.time() + 3300
+    
+    recorded = [cycle["duration"] for cycle in bot.http.recorded_cycles]
+    cycles = args.cycles or len(recorded)
+    replayed = []
+    for number in range(cycles):
+        started = time.perf_counter()
+        success = bot.process_and_post_product()
+        replayed.append(time.perf_counter() - started)
+        baseline = f"recorded {recorded[number]:.2f}s" if number < len(recorded) else "no recording"
+        logger.info(f"📼 Cycle {number + 1}/{cycles}: {replayed[-1]:.2f}s ({baseline}), success={success}")
+    
+    def summary(values):
+        ordered = sorted(values)
+        return {
+            "cycles": len(ordered),
+            "mean_s": round(sum(ordered) / len(ordered), 4) if ordered else None,
+            "p50_s": round(ordered[len(ordered) // 2], 4) if ordered else None,
+            "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4) if ordered else None
+        }
+    
+    report = {
+        "cassette": args.cassette,
+        "latency_scale": args.scale,
+        "recorded": summary(recorded[:cycles]),
+        "replayed": summary(replayed),
+        "unmatched_requests_left": sum(len(queue) for queue in bot.http.queues.values())
+    }
+    if report["recorded"]["mean_s"] and args.scale == 1.0:
+        change = report["replayed"]["mean_s"] / report["recorded"]["mean_s"] - 1
+        report["mean_change_pct"] = round(change * 100, 1)
+    logger.info(f"📊 Replay report: {json.dumps(report)}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+def run_post_updates(args):
+    """Patch published posts from a product facts feed, using the bot's credentials"""
+    bot = AmazonAffiliateBlogBot()
+    if args.rate:
+        bot.post_update_rate = args.rate
+    stats = bot.update_posts(load_product_facts(args.facts), batch_size=args.batch_size, dry_run=args.dry_run)
+    logger.info(f"🔁 Post update result: {stats}")
+    return 0 if stats["failed"] == 0 else 1
+
+def run_cli(argv):
+    """Command line entry point for offline tools"""
+    parser = argparse.ArgumentParser(description="Amazon Affiliate Bot tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    backfill = subparsers.add_parser("backfill", help="Pre-build articles offline into a JSONL or SQLite archive")
+    backfill.add_argument("--count", type=int, required=True, help="Total number of articles to build")
+    backfill.add_argument("--output", default=os.path.join(os.getenv('BOT_DATA_DIR', 'data'), 'backfill.jsonl'),
+                          help="Archive path; .sqlite/.sqlite3/.db selects SQLite, anything else JSONL")
+    backfill.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    backfill.add_argument("--chunk", type=int, default=256, help="Articles per checkpoint")
+    backfill.add_argument("--seed", type=int, default=1)
+    backfill.add_argument("--use-gemini", action="store_true", help="Ask Gemini for each article (slow, uses quota)")
+    backfill.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    backfill.set_defaults(handler=run_backfill)
+    
+    replay = subparsers.add_parser("replay", help="Replay recorded cycles from a cassette and report latency")
+    replay.add_argument("cassette", help="Cassette recorded with BOT_HTTP_MODE=record")
+    replay.add_argument("--scale", type=float, default=1.0, help="Multiplier for recorded upstream latency (0 = none)")
+    replay.add_argument("--cycles", type=int, default=0, help="Cycles to run (default: as many as recorded)")
+    replay.add_argument("--seed", type=int, default=0)
+    replay.add_argument("--report", help="Also write the JSON report to this path")
+    replay.set_defaults(handler=run_replay)
+    
+    update_posts = subparsers.add_parser("update-posts", help="Patch prices/ratings/reviews in published posts")
+    update_posts.add_argument("--facts", required=True, help="JSON lines of {asin, price, rating, reviews}")
+    update_posts.add_argument("--batch-size", type=int, default=50)
+    update_posts.add_argument("--rate", type=float, help="Blogger requests per second")
+    update_posts.add_argument("--dry-run", action="store_true", help="Only count posts that would change")
+    update_posts.set_defaults(handler=run_post_updates)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
 def main():
     """Main function with proper error handling"""
+    if len(sys.argv) > 1:
+        return run_cli(sys.argv[1:])
+    
     logger.info("🚀 Amazon Affiliate Bot initializing...")
+    bot = None
     
     try:
         # Start health server in background thread for Render
@@ -1023,7 +4182,8 @@ def main():
         logger.info("✅ Health server started successfully")
         
         # Initialize and start the main bot
-        bot = AmazonAffiliateBlogBot()
+        global bot_instance
+        bot = bot_instance = AmazonAffiliateBlogBot()
         bot_success = bot.run_bot()
         
         if bot_success:
@@ -1038,12 +4198,17 @@ def main():
         import traceback
         traceback.print_exc()
     
-    # Keep the health server running for a bit after bot stops
-    logger.info("🌐 Keeping health server alive for final requests...")
-    try:
-        time.sleep(30)  # Give time for any final health checks
-    except KeyboardInterrupt:
-        pass
+    # Keep the health server running for a bit after bot stops, unless
+    # we're stopping because of a signal - then exit within the shutdown bound
+    if bot is None or not bot.shutdown_event.is_set():
+        logger.info("🌐 Keeping health server alive for final requests...")
+        try:
+            if bot is not None:
+                bot.shutdown_event.wait(30)  # Give time for any final health checks
+            else:
+                time.sleep(30)
+        except KeyboardInterrupt:
+            pass
     
     logger.info("👋 Application shutting down")
     return 0
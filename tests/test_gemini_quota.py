@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+
+from main import AmazonAffiliateBlogBot, Deadline, Product
+
+
+def quota_failure(quota_id, retry_delay=None):
+    details = [{
+        "@type": "type.googleapis.com/google.rpc.QuotaFailure",
+        "violations": [{"quotaId": quota_id}]
+    }]
+    if retry_delay is not None:
+        details.append({"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay})
+    return {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": details}}
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class GeminiQuotaTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-test-')
+        self.bot = AmazonAffiliateBlogBot()
+        self.bot.retry_delay = 0
+        self.product = Product("Echo Dot", "$49.99", 4.5, 1000, "B07RJMQ2GY", "electronics")
+
+    def generate(self, responses):
+        self.bot.http = FakeSession(responses)
+        content = self.bot.generate_seo_content(self.product, Deadline(30))
+        return content, self.bot.http.calls
+
+    def gemini_plan(self):
+        return self.bot.quota_ledger.plan("gemini", self.bot.gemini_credential)
+
+    def test_daily_quota_marks_the_daily_window_exhausted(self):
+        daily = FakeResponse(429, quota_failure("GenerateRequestsPerDayPerProjectPerModel-FreeTier", "30s"))
+        content, calls = self.generate([daily])
+        self.assertEqual(calls, 1)
+        self.assertIn("content", content)
+        self.assertEqual(self.gemini_plan(), "exhausted")
+
+    def test_short_rate_limit_is_retried_without_marking_the_quota(self):
+        article = {"title": "Echo Dot review", "meta_description": "A review", "content": "<p>Good</p>"}
+        ok = FakeResponse(200, {"candidates": [{"content": {"parts": [{"text": json.dumps(article)}]}}]})
+        per_minute = FakeResponse(429, quota_failure("GenerateRequestsPerMinutePerProjectPerModel", "0s"))
+        content, calls = self.generate([per_minute, ok])
+        self.assertEqual(calls, 2)
+        self.assertEqual(content["title"], "Echo Dot review")
+        self.assertNotEqual(self.gemini_plan(), "exhausted")
+
+    def test_long_rate_limit_pauses_gemini_without_marking_the_quota(self):
+        limited = FakeResponse(429, {"error": {"status": "RESOURCE_EXHAUSTED"}}, {"Retry-After": "600"})
+        content, calls = self.generate([limited])
+        self.assertEqual(calls, 1)
+        self.assertNotEqual(self.gemini_plan(), "exhausted")
+        self.assertFalse(self.bot._gemini_quota_ok())
+
+
+if __name__ == "__main__":
+    unittest.main()
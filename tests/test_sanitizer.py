@@ -0,0 +1,74 @@
+import unittest
+
+from main import INLINE_TAGS, sanitize_html
+
+
+class SanitizeHtmlTest(unittest.TestCase):
+
+    def test_keeps_allowed_tags_and_drops_the_rest(self):
+        self.assertEqual(sanitize_html("<p>ok</p><blink>kept text</blink><img src=x>"),
+                         "<p>ok</p>kept text")
+
+    def test_drops_script_like_tags_with_their_content(self):
+        self.assertEqual(sanitize_html("a<script>alert(1)</script>b"), "ab")
+        self.assertEqual(sanitize_html("a<SCRIPT>alert(1)</ScRiPt>b"), "ab")
+        self.assertEqual(sanitize_html("a<iframe src=x>frame</iframe>b<style>p{}</style>c"), "abc")
+        self.assertEqual(sanitize_html("<p>a</p><script>never closed <p>b</p>"), "<p>a</p>")
+
+    def test_custom_allowlist(self):
+        self.assertEqual(sanitize_html("<p>hello <b>x</b><a href='https://e.com'>y</a></p>", INLINE_TAGS),
+                         "hello <b>x</b>y")
+
+    def test_drops_unsafe_attributes(self):
+        self.assertEqual(sanitize_html('<p style="x" class="y" onclick="steal()">z</p>'), "<p>z</p>")
+        self.assertEqual(sanitize_html('<span class="note">n</span>'), '<span class="note">n</span>')
+
+    def test_drops_javascript_hrefs(self):
+        for href in ("javascript:alert(1)", "JaVaScRiPt:alert(1)", "&#106;avascript:alert(1)",
+                     " javascript:alert(1)", "data:text/html,alert(1)", "vbscript:x"):
+            with self.subTest(href=href):
+                self.assertEqual(sanitize_html(f'<a href="{href}">x</a>'), '<a rel="nofollow noopener">x</a>')
+
+    def test_keeps_safe_hrefs_escaped(self):
+        self.assertEqual(sanitize_html('<a href="https://e.com/?a=1&amp;b=2" title=t>d</a>'),
+                         '<a href="https://e.com/?a=1&amp;b=2" title="t" rel="nofollow noopener">d</a>')
+        self.assertEqual(sanitize_html('<a href="/relative">r</a>'),
+                         '<a href="/relative" rel="nofollow noopener">r</a>')
+
+    def test_escapes_text(self):
+        self.assertEqual(sanitize_html("<p>a < b & c &gt; d</p>"), "<p>a &lt; b &amp; c &gt; d</p>")
+        self.assertEqual(sanitize_html('<p>"quoted" {json}</p>'), '<p>"quoted" {json}</p>')
+
+    def test_truncates_on_a_word_boundary_and_closes_tags(self):
+        self.assertEqual(sanitize_html("<p><strong>abc</strong> <em>defgh</em> ijklmnop qr</p>", max_length=12),
+                         "<p><strong>abc</strong> <em>defgh</em>…</p>")
+        self.assertEqual(sanitize_html("<p>one two three</p>", max_length=9), "<p>one two…</p>")
+
+    def test_truncates_a_single_long_word(self):
+        self.assertEqual(sanitize_html("<p>Supercalifragilistic</p>", max_length=5), "<p>Super…</p>")
+
+    def test_balances_unclosed_and_stray_tags(self):
+        self.assertEqual(sanitize_html("<ul><li>a<li>b"), "<ul><li>a</li><li>b</li></ul>")
+        self.assertEqual(sanitize_html("</p></div>text<b><i>x</b>y"), "text<b><i>x</i></b>y")
+        self.assertEqual(sanitize_html("<p>a<br>b<hr></p>"), "<p>a<br>b<hr></p>")
+
+    def test_caps_nesting_depth(self):
+        self.assertEqual(sanitize_html("<div>" * 10 + "x", max_depth=3), "<div><div><div>x</div></div></div>")
+
+    def test_skips_comments_and_doctypes(self):
+        self.assertEqual(sanitize_html("<!-- <script>x</script> --><!DOCTYPE html><p>x"), "<p>x</p>")
+
+    def test_unicode_text_is_preserved(self):
+        self.assertEqual(sanitize_html("<p>é 日本 😀</p>"), "<p>é 日本 😀</p>")
+
+    def test_unicode_that_changes_length_when_lowercased(self):
+        # 'İ'.lower() is two code points; offsets into the input must not drift
+        text = "İ" * 12 + "<script>x</script><p>Keep this paragraph please</p>tail"
+        self.assertEqual(sanitize_html(text), "İ" * 12 + "<p>Keep this paragraph please</p>tail")
+
+    def test_non_ascii_lookalike_does_not_close_a_dropped_tag(self):
+        self.assertEqual(sanitize_html("<script>x</scrİpt>still script</script>after"), "after")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,717 @@
+# tools/bench.py - Benchmarks, soak test and fault harness for the bot
+# Everything here runs against local stand-ins for the upstream APIs; none of
+# it is imported by the bot itself. Run from the repository root:
+#   python -m tools.bench <command> [options]
+
+import os
+import sys
+import time
+import json
+import random
+import hashlib
+import argparse
+import sqlite3
+import tempfile
+import logging
+import multiprocessing
+import tracemalloc
+from datetime import datetime, timezone
+from threading import Thread, Event, Lock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+import requests
+import numpy as np
+
+from main import (
+    AmazonAffiliateBlogBot, AsinValidator, Coordinator, Product, ProductScorer,
+    current_rss_bytes, fact_span, sanitize_html,
+)
+
+class LocalStandInServer:
+    """Threaded HTTP server on 127.0.0.1 standing in for an upstream in benchmarks"""
+
+    def __init__(self, handler_class):
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 256
+        self.server = Server(('127.0.0.1', 0), handler_class)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+def benchmark_scoring(args):
+    """Time the per-tick select() over a synthetic catalog, plus the one-off pool load"""
+    rng = np.random.default_rng(args.seed)
+    size = args.items
+    scorer = ProductScorer(seed=args.seed)
+    
+    # Every ASIN is listed under two categories, like the shipped catalog
+    products = [Product(title=f"Product {i}", price=f"${rng.uniform(5, 500):.2f}", rating=round(rng.uniform(3.0, 5.0), 1),
+                        reviews=int(rng.integers(0, 20000)), asin=f"ASIN{i % (size // 2):06d}",
+                        category=f"category-{(i * 7) % 64}")
+                for i in range(size)]
+    started = time.perf_counter()
+    scorer.set_candidates(products)
+    load_ms = (time.perf_counter() - started) * 1000
+    
+    # Seed some posting / CTR history so every term is exercised
+    now = time.time()
+    known = len(scorer.asin_ids)
+    history = rng.random(known) < 0.3
+    scorer.asin_last_posted[:known][history] = now - rng.uniform(0, 30 * 86400, history.sum())
+    scorer.asin_ctr[:known][history] = rng.uniform(0, 0.08, history.sum())
+    unavailable = {f"ASIN{i:06d}" for i in rng.choice(known, known // 100, replace=False)}
+    
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        top = scorer.select(args.k, exclude=unavailable, now=now)
+        timings.append((time.perf_counter() - started) * 1000)
+    
+    timings.sort()
+    duplicates = len(top) - len({product.asin for product in top})
+    print(f"Loaded {size:,} candidates in {load_ms:.0f} ms (once per catalog change)")
+    print(f"select() top-{args.k} = {[product.asin for product in top[:5]]}..., "
+          f"{len(unavailable):,} excluded, {duplicates} duplicate ASINs")
+    print(f"Latency: best {timings[0]:.2f} ms, median {timings[len(timings) // 2]:.2f} ms, "
+          f"worst {timings[-1]:.2f} ms over {args.repeat} runs")
+    return 0
+
+def benchmark_validator(args):
+    """Measure ASIN validation throughput against a local stand-in for amazon.com"""
+    latency = args.latency_ms / 1000
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *log_args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            asin = self.path.rsplit('/', 1)[-1]
+            bucket = int(hashlib.md5(asin.encode()).hexdigest(), 16) % 20
+            if bucket == 0:
+                self.send_response(404)
+            elif bucket == 1:
+                self.send_response(301)
+                self.send_header('Location', f"/dp/{asin[::-1]}")
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    asins = [f"B{i:09d}" for i in range(args.asins)]
+    with LocalStandInServer(StandInHandler) as server:
+        os.makedirs(args.data_dir, exist_ok=True)
+        path = os.path.join(args.data_dir, 'bench-asins.sqlite3')
+        if os.path.exists(path):
+            os.remove(path)
+        validator = AsinValidator(path, base_url=server.url, concurrency=args.concurrency,
+                                  per_host_concurrency=args.concurrency, per_host_interval=args.interval_ms / 1000)
+        
+        started = time.perf_counter()
+        counts = validator.validate(asins)
+        elapsed = time.perf_counter() - started
+        print(f"Full pass: {counts} in {elapsed:.2f}s = {counts['checked'] / elapsed:.0f} checks/sec "
+              f"({args.concurrency} workers, {args.latency_ms} ms upstream latency)")
+        
+        started = time.perf_counter()
+        counts = validator.validate(asins)
+        print(f"Incremental pass: {counts} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        print(f"Unavailable ASINs: {len(validator.unavailable_asins)}")
+    return 0
+
+class CannedUpstreamSession(requests.Session):
+    """In-process stand-in for every upstream, returning fixed successful responses"""
+
+    def __init__(self):
+        super().__init__()
+        self.post_counter = 0
+        articles = [{"index": i, "title": f"Canned review {i}", "meta_description": "Canned",
+                     "content": "<p>" + "Canned review body. " * 200 + "</p>"} for i in range(8)]
+        usage = {"promptTokenCount": 300, "candidatesTokenCount": 3000, "totalTokenCount": 3300}
+        # v1beta serves batch requests (a JSON array), v1 single articles
+        self.gemini_bodies = {
+            version: json.dumps({
+                "candidates": [{"content": {"parts": [{"text": json.dumps(text)}]}}],
+                "usageMetadata": usage
+            }).encode()
+            for version, text in (("v1beta", articles), ("v1", articles[0]))
+        }
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.encoding = 'utf-8'
+        host = urlparse(url).netloc
+        if 'generativelanguage' in host:
+            response._content = self.gemini_bodies[urlparse(url).path.split('/')[1]]
+        elif 'bitly' in host:
+            response._content = json.dumps({"link": f"https://bit.ly/{hashlib.md5(url.encode()).hexdigest()[:7]}"}).encode()
+        elif 'oauth2' in host:
+            response._content = b'{"access_token": "canned", "expires_in": 3600}'
+        elif method.upper() == 'POST' and 'googleapis' in host:
+            self.post_counter += 1
+            response._content = json.dumps({"id": str(self.post_counter),
+                                            "url": f"https://example.blogspot.com/p/{self.post_counter}"}).encode()
+        elif 'googleapis' in host and not urlparse(url).path.endswith('/posts'):
+            response._content = b'{"name": "Canned blog"}'
+        elif 'googleapis' in host:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response._content = b''
+        return response
+
+def run_soak(args):
+    """Run thousands of posting cycles against canned upstreams and check memory stays flat"""
+    os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-soak-')
+    logging.getLogger().setLevel(logging.WARNING)
+    tracemalloc.start()
+    
+    bot = AmazonAffiliateBlogBot()
+    bot.http = CannedUpstreamSession()
+    bot.token_type = 'access'
+    bot.access_token = 'canned'
+    bot.token_expires_at = float('inf')
+    bot.retry_delay = 0
+    bot.repost_cooldown = 0
+    bot.quota_limits.clear()
+    
+    samples = []
+    warmup = max(1, args.cycles // 10)
+    interval = max(1, args.cycles // 20)
+    started = time.perf_counter()
+    for cycle in range(1, args.cycles + 1):
+        bot.process_and_post_product()
+        if cycle >= warmup and (cycle - warmup) % interval == 0 or cycle == args.cycles:
+            traced, _ = tracemalloc.get_traced_memory()
+            samples.append((cycle, current_rss_bytes() / 2**20, traced / 2**20))
+            print(f"cycle {cycle:>6}: rss {samples[-1][1]:7.2f} MB, traced {samples[-1][2]:7.2f} MB", flush=True)
+    
+    elapsed = time.perf_counter() - started
+    rss_growth = samples[-1][1] - samples[0][1]
+    traced_growth = samples[-1][2] - samples[0][2]
+    flat = traced_growth <= args.max_growth_mb
+    print(f"{args.cycles} cycles in {elapsed:.1f}s; growth after warm-up: rss {rss_growth:+.2f} MB, "
+          f"traced {traced_growth:+.2f} MB -> {'FLAT' if flat else 'GROWING'} (limit {args.max_growth_mb} MB)")
+    return 0 if flat else 1
+
+def benchmark_click_ingestion(args):
+    """Run click ingestion against a local stand-in for the Bitly API"""
+    os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-clicks-')
+    rng = random.Random(args.seed)
+    now = time.time()
+    links = []
+    for i in range(args.links):
+        asin = f"B{rng.randrange(10**9):09d}"
+        links.append({"id": f"bit.ly/{i:07x}", "long_url": f"https://www.amazon.com/dp/{asin}?tag=bench",
+                      "created": now - rng.uniform(0, 60 * 86400)})
+    links.sort(key=lambda link: -link["created"])
+    served = {"requests": 0}
+    
+    def daily_clicks(link_id, day):
+        # Sparse: roughly --click-rate percent of links get clicks on any given day
+        value = int(hashlib.md5(f"{link_id}{day}".encode()).hexdigest()[:6], 16)
+        return value % 20 + 1 if value % 100 < args.click_rate else 0
+
+    class BitlyStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *log_args):
+            pass
+
+        def reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            served["requests"] += 1
+            parsed = urlparse(self.path)
+            query = dict(part.split('=', 1) for part in parsed.query.split('&') if '=' in part)
+            if parsed.path == '/v4/user':
+                return self.reply({"default_group_guid": "Bbench"})
+            if parsed.path == '/v4/groups/Bbench/bitlinks':
+                size = int(query.get('size', 50))
+                page = int(query.get('page', 1))
+                created_after = float(query.get('created_after', 0))
+                matching = [link for link in links if link["created"] > created_after]
+                chunk = matching[(page - 1) * size:page * size]
+                more = page * size < len(matching)
+                return self.reply({
+                    "links": [{"id": link["id"], "link": f"https://{link['id']}", "long_url": link["long_url"],
+                               "created_at": datetime.fromtimestamp(link["created"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000")}
+                              for link in chunk],
+                    "pagination": {"next": f"{server.url}/v4/groups/Bbench/bitlinks?size={size}&created_after={int(created_after)}&page={page + 1}" if more else ""}
+                })
+            if parsed.path == '/v4/groups/Bbench/bitlinks/clicks':
+                day = query['unit_reference'][:10]
+                counted = sorted(((daily_clicks(link["id"], day), link["id"]) for link in links), reverse=True)
+                size = int(query.get('size', 50))
+                return self.reply({"sorted_links": [{"id": link_id, "clicks": clicks} for clicks, link_id in counted[:size]]})
+            if parsed.path.endswith('/clicks/summary'):
+                link_id = parsed.path[len('/v4/bitlinks/'):-len('/clicks/summary')]
+                return self.reply({"total_clicks": daily_clicks(link_id, query['unit_reference'][:10])})
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    with LocalStandInServer(BitlyStandIn) as server:
+        bot = AmazonAffiliateBlogBot()
+        bot.bitly_api_base = f"{server.url}/v4"
+        
+        for label in ("Initial", "Incremental"):
+            if label == "Incremental":
+                # A few hundred links created since the first run
+                for i in range(args.new_links):
+                    links.insert(0, {"id": f"bit.ly/n{i:06x}", "long_url": "https://www.amazon.com/dp/B000000001",
+                                     "created": time.time() + 1})
+            served["requests"] = 0
+            started = time.perf_counter()
+            stats = bot.ingest_click_metrics(max_days=args.days)
+            elapsed = time.perf_counter() - started
+            used = bot.quota_ledger.usage("bitly_analytics", bot.bitly_credential)["daily"]
+            print(f"{label} run: {stats} in {elapsed:.2f}s, {served['requests']} API requests, "
+                  f"{(stats['new_links'] or args.links) / elapsed:.0f} links/sec; "
+                  f"analytics quota {used['used']}/{used['limit']}, "
+                  f"synced through {bot.click_analytics.get_state('clicks_synced_through')}")
+    return 0
+
+def benchmark_sanitizer(args):
+    """Time sanitize_html on realistic and pathological inputs of growing size"""
+    paragraph = ('<h3>Why it stands out</h3><p>The <strong>build quality</strong> is excellent &amp; the '
+                 '<a href="https://example.com/spec" onclick="track()">spec sheet</a> backs it up.</p>'
+                 '<ul><li>Long battery life<li>Quiet operation</ul><script>alert(1)</script>')
+    shapes = {
+        "article": lambda size: paragraph * (size // len(paragraph) + 1),
+        "open-angles": lambda size: "<" * size,
+        "unclosed-tag": lambda size: '<a href="' + "x" * size,
+        "tag-soup": lambda size: "<a <b <c " * (size // 9 + 1) + ">",
+        "deep-nesting": lambda size: "<div><b>" * (size // 8 + 1),
+        "stray-closers": lambda size: "</p></div>" * (size // 10 + 1),
+        "comment-openers": lambda size: "<!--" * (size // 4 + 1),
+        "unclosed-script": lambda size: "<script>" + "x<" * (size // 2),
+        "entities": lambda size: "&amp;&lt;&#x41;&" * (size // 16 + 1),
+    }
+    sizes = [int(kb * 1024) for kb in args.sizes_kb]
+    print(f"{'input':<18}" + ''.join(f"{kb:>10.0f}KB" for kb in args.sizes_kb) + f"{'growth':>10}")
+    worst = 0.0
+    for name, make in shapes.items():
+        per_byte = []
+        cells = []
+        for size in sizes:
+            text = make(size)[:size]
+            best = float('inf')
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                sanitize_html(text, max_length=len(text))
+                best = min(best, time.perf_counter() - started)
+            per_byte.append(best / size)
+            cells.append(f"{best * 1000:>10.2f}ms")
+        # Time per byte at the largest size relative to the smallest; ~1.0 means linear
+        growth = per_byte[-1] / per_byte[0]
+        worst = max(worst, growth)
+        print(f"{name:<18}" + ''.join(cells) + f"{growth:>9.2f}x")
+    print(f"worst per-byte growth {worst:.2f}x from {args.sizes_kb[0]:.0f}KB to {args.sizes_kb[-1]:.0f}KB")
+    return 0
+
+def benchmark_post_updates(args):
+    """Re-check a large archive against a local Blogger stand-in where a fraction of facts changed"""
+    os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-updates-')
+    rng = random.Random(args.seed)
+    posts = {}
+    facts_by_asin = {}
+    for i in range(args.posts):
+        asin = f"B{i:09d}"
+        facts = {"price": f"${rng.randint(25, 299)}.{rng.randint(10, 99)}", "rating": str(round(rng.uniform(4.2, 4.9), 1)),
+                 "reviews": f"{rng.randint(500, 5000):,}"}
+        facts_by_asin[asin] = facts
+        content = (f'<div data-asin="{asin}"><p>Price {fact_span("price", facts["price"])}, rated '
+                   f'{fact_span("rating", facts["rating"])}/5 by {fact_span("reviews", facts["reviews"])} buyers.</p></div>')
+        posts[str(i)] = {"id": str(i), "etag": f'"{i}-0"', "content": content}
+    served = {"GET": 0, "PATCH": 0}
+
+    class BloggerStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *log_args):
+            pass
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            served["GET"] += 1
+            post = posts.get(urlparse(self.path).path.rsplit('/', 1)[-1])
+            self.reply(200 if post else 404, post or {})
+
+        def do_PATCH(self):
+            served["PATCH"] += 1
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            post = posts[urlparse(self.path).path.rsplit('/', 1)[-1]]
+            if self.headers.get('If-Match') != post["etag"]:
+                return self.reply(412, {})
+            version = int(post["etag"].strip('"').split('-')[1]) + 1
+            post.update(content=body["content"], etag=f'"{post["id"]}-{version}"')
+            self.reply(200, post)
+
+    with LocalStandInServer(BloggerStandIn) as server:
+        bot = AmazonAffiliateBlogBot()
+        bot.blogger_api_base = f"{server.url}/blogger/v3"
+        bot.token_type = 'access'
+        bot.access_token = 'bench'
+        bot.token_expires_at = float('inf')
+        bot.post_update_rate = args.rate
+        bot.quota_limits["blogger_updates"] = {"daily": None, "monthly": None}
+        
+        started = time.perf_counter()
+        bot.post_archive.upsert([{"id": post["id"], "asin": f"B{int(post['id']):09d}", "content": post["content"],
+                                  "published": "2024-01-01T00:00:00Z"} for post in posts.values()])
+        print(f"Archived {args.posts} posts in {time.perf_counter() - started:.2f}s")
+        
+        for label in ("Unchanged feed", "Changed feed", "Re-run"):
+            if label == "Changed feed":
+                for asin in rng.sample(sorted(facts_by_asin), int(args.posts * args.changed)):
+                    facts_by_asin[asin] = dict(facts_by_asin[asin], price=f"${rng.randint(25, 299)}.{rng.randint(10, 99)}")
+            served.update(GET=0, PATCH=0)
+            started = time.perf_counter()
+            stats = bot.update_posts(facts_by_asin, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - started
+            print(f"{label}: {stats['checked']} checked, {stats['changed']} changed, "
+                  f"{stats['patched']} patched in {elapsed:.2f}s; {served['GET']} GET + {served['PATCH']} PATCH")
+    return 0
+
+def coordination_worker(path, instance_id, asins, lease_ttl, latency, crash_after, ready, results):
+    """coordination benchmark process: claim, 'publish' and record ASINs until none are left"""
+    coordinator = Coordinator(path, instance_id, lease_ttl=lease_ttl)
+    shutdown = Event()
+    Thread(target=coordinator.run, args=(shutdown,), daemon=True).start()
+    ready.wait()  # start together, so interpreter startup isn't timed
+    rng = random.Random(instance_id)
+    published = []
+    while True:
+        published_anywhere = coordinator.published_since(0)
+        remaining = [asin for asin in asins if asin not in published_anywhere]
+        if not remaining:
+            break
+        rng.shuffle(remaining)
+        asin = next((asin for asin in remaining if coordinator.claim_product(asin, float('inf'))), None)
+        if asin is None:
+            time.sleep(lease_ttl / 10)  # everything left is claimed; wait for publishes or expiry
+            continue
+        if crash_after is not None and len(published) >= crash_after:
+            # Die holding the claim, without releasing anything
+            results.put((instance_id, published, {"asin": asin, "at": time.time()}))
+            results.close()
+            results.join_thread()  # os._exit skips the queue's feeder flush
+            os._exit(1)
+        time.sleep(latency)  # the upstream publish call
+        coordinator.record_published(asin, f"{instance_id}-{len(published)}")
+        published.append(asin)
+    shutdown.set()
+    coordinator.close()
+    results.put((instance_id, published, None))
+
+def benchmark_coordination(args):
+    """Run several coordinated worker processes over one candidate pool and check for duplicates"""
+    asins = [f"B{i:09d}" for i in range(args.products)]
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    print(f"{'instances':>9}{'crash':>7}{'seconds':>9}{'posts/s':>9}{'speedup':>9}{'dupes':>7}{'orphan picked up':>18}")
+    runs = [(count, False) for count in args.instances] + [(max(args.instances), True)]
+    for instances, crash in runs:
+        path = os.path.join(tempfile.mkdtemp(prefix='bot-coordination-'), 'coordination.sqlite3')
+        Coordinator(path).close()  # create the schema before the workers race for it
+        results = context.Queue()
+        ready = context.Barrier(instances + 1)
+        workers = [context.Process(target=coordination_worker,
+                                   args=(path, f"worker-{i}", asins, args.lease_ttl, args.latency_ms / 1000,
+                                         args.products // (instances * 4) if crash and i == 0 else None, ready, results))
+                   for i in range(instances)]
+        for worker in workers:
+            worker.start()
+        ready.wait()
+        started = time.perf_counter()
+        reports = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+        
+        published = [asin for _, items, _ in reports for asin in items]
+        duplicates = len(published) - len(set(published))
+        missing = len(set(asins) - set(published))
+        throughput = len(published) / elapsed
+        baseline = baseline or throughput
+        pickup = "-"
+        crashed = next((info for _, _, info in reports if info), None)
+        if crashed:
+            with sqlite3.connect(path) as conn:
+                row = conn.execute("SELECT published_at FROM published WHERE asin = ?", (crashed["asin"],)).fetchone()
+            pickup = f"{row[0] - crashed['at']:.2f}s" if row else "never"
+        print(f"{instances:>9}{'yes' if crash else 'no':>7}{elapsed:>9.2f}{throughput:>9.1f}{throughput / baseline:>8.2f}x"
+              f"{duplicates:>7}{pickup:>18}" + (f"  ({missing} never published)" if missing else ""))
+    print(f"lease TTL {args.lease_ttl}s, publish latency {args.latency_ms:.0f}ms, {args.products} products")
+    return 0
+
+# Scripted upstream failures: upstream -> faults served to its first requests,
+# after which it is healthy again. A fault is an HTTP status, "retry-after"
+# (429 with Retry-After), "hang" (answer after the client gave up) or
+# "malformed" (200 with unparseable Gemini output).
+FAULT_SCENARIOS = {
+    "gemini-timeouts": {"gemini": ["hang", "hang"]},
+    "gemini-5xx-burst": {"gemini": [503, 503, 500]},
+    "gemini-malformed": {"gemini": ["malformed", "malformed"]},
+    "gemini-400": {"gemini": [400]},
+    "gemini-quota-429": {"gemini": [429]},
+    "bitly-429-retry-after": {"bitly": ["retry-after"]},
+    "bitly-5xx-burst": {"bitly": [502, 502, 502, 502]},
+    "blogger-expired-token": {"blogger_post": [401, 401]},
+    "blogger-5xx-burst": {"blogger_post": [503, 503, 503, 503]},
+    "blogger-timeouts": {"blogger_post": ["hang", "hang"]},
+    "blogger-403": {"blogger_post": [403]},
+    "oauth-outage-on-refresh": {"blogger_post": [401], "oauth": [503, 503, 503, 503]},
+}
+
+def run_fault_harness(args):
+    """Run posting cycles against local stand-ins with scripted faults and report the recovery cost"""
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+    lock = Lock()
+    state = {"script": {}, "counts": {}, "faults": 0}
+    gemini_article = {"title": "Harness review", "meta_description": "Harness",
+                      "content": "<p>" + "Harness review body. " * 50 + "</p>"}
+
+    def upstream_of(method, path):
+        if path.startswith('/token'):
+            return "oauth"
+        if path.startswith('/blogger/'):
+            return "blogger_post" if method == 'POST' else "blogger_sync"
+        if path.startswith(('/v1/', '/v1beta/')):
+            return "gemini"
+        if path.startswith('/v4/'):
+            return "bitly"
+        return "image"
+
+    class FaultyUpstream(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *log_args):
+            pass
+
+        def reply(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def healthy(self, upstream):
+            if upstream == "oauth":
+                return self.reply(200, b'{"access_token": "harness", "expires_in": 3600}')
+            if upstream == "blogger_sync":
+                return self.reply(304)
+            if upstream == "blogger_post":
+                return self.reply(200, json.dumps({"id": str(time.time_ns()), "url": "https://example.blogspot.com/p"}).encode())
+            if upstream == "gemini":
+                text = json.dumps(gemini_article)
+                return self.reply(200, json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode())
+            if upstream == "bitly":
+                return self.reply(200, json.dumps({"link": f"https://bit.ly/{time.time_ns() % 10**7:07d}"}).encode())
+            return self.reply(200)
+
+        def handle_request(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            upstream = upstream_of(self.command, urlparse(self.path).path)
+            with lock:
+                state["counts"][upstream] = state["counts"].get(upstream, 0) + 1
+                script = state["script"].get(upstream)
+                fault = script.pop(0) if script else None
+                state["faults"] += fault is not None
+            try:
+                if fault is None:
+                    return self.healthy(upstream)
+                if fault == "hang":
+                    time.sleep(args.hang)
+                    return self.healthy(upstream)
+                if fault == "retry-after":
+                    return self.reply(429, b'{"message": "RATE_LIMIT_EXCEEDED"}', {'Retry-After': '1'})
+                if fault == "malformed":
+                    body = {"candidates": [{"content": {"parts": [{"text": "Sure! Here is your article: {title: oops"}]}}]}
+                    return self.reply(200, json.dumps(body).encode())
+                return self.reply(fault, json.dumps({"error": {"code": fault, "message": "injected fault"}}).encode())
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client timed out first, as intended
+
+        do_GET = do_POST = do_HEAD = handle_request
+
+    def cycle_counts():
+        with lock:
+            return dict(state["counts"], faults=state["faults"])
+
+    def run_scenario(server, script, healthy_requests=None):
+        """Cycles until recovery; with no healthy_requests yet, a single baseline cycle"""
+        os.environ['BOT_DATA_DIR'] = tempfile.mkdtemp(prefix='bot-faults-')
+        bot = AmazonAffiliateBlogBot()
+        bot.gemini_api_base = server.url
+        bot.blogger_api_base = f"{server.url}/blogger/v3"
+        bot.oauth_token_url = f"{server.url}/token"
+        bot.bitly_api_base = f"{server.url}/v4"
+        bot.amazon_image_base = f"{server.url}/images/I"
+        bot.token_type = 'refresh'
+        bot.refresh_token = bot.client_id = bot.client_secret = 'harness'
+        bot.gemini_batch_size = 1  # exercise the single-article retry paths
+        bot.repost_cooldown = 0
+        bot.timeout_scale = args.timeout_scale
+        bot.retry_delay *= args.timeout_scale
+        
+        # Faults hit a bot that is already running (token fetched, caches warm)
+        bot.process_and_post_product()
+        with lock:
+            state["script"] = {upstream: list(faults) for upstream, faults in script.items()}
+            state["counts"] = {}
+            state["faults"] = 0
+        cycles = []
+        for _ in range(args.max_cycles):
+            bot.short_url_cache.clear()  # every cycle shortens, like a fresh product would
+            before = cycle_counts()
+            started = time.perf_counter()
+            success = bot.process_and_post_product()
+            elapsed = time.perf_counter() - started
+            after = cycle_counts()
+            faults = after.pop("faults") - before.pop("faults")
+            requests_by_upstream = {u: n - before.get(u, 0) for u, n in after.items() if n - before.get(u, 0)}
+            clean = success and not faults and requests_by_upstream == (healthy_requests or requests_by_upstream)
+            cycles.append({"success": success, "clean": clean, "seconds": elapsed, "requests": requests_by_upstream})
+            # Recovered once a fault-free cycle posts with the same upstream traffic as a healthy one
+            if healthy_requests is None or clean:
+                break
+        return bot, cycles
+
+    with LocalStandInServer(FaultyUpstream) as server:
+        _, baseline_cycles = run_scenario(server, {})
+        healthy_requests = baseline_cycles[0]["requests"]
+        samples = [run_scenario(server, {})[1][0]["seconds"] for _ in range(args.baseline_cycles)]
+        baseline_seconds = sorted(samples)[len(samples) // 2]
+        healthy_total = sum(healthy_requests.values())
+        print(f"baseline: {baseline_seconds * 1000:.1f} ms/cycle, {healthy_total} requests/cycle {healthy_requests}")
+        
+        names = args.scenario or list(FAULT_SCENARIOS)
+        report = {"baseline": {"cycle_s": round(baseline_seconds, 4), "requests": healthy_requests}, "scenarios": {}}
+        print(f"{'scenario':<24}{'recovered':>10}{'cycles':>8}{'ttr_s':>9}{'wasted':>8}{'faults':>8}{'inflation':>11}")
+        for name in names:
+            _, cycles = run_scenario(server, FAULT_SCENARIOS[name], healthy_requests)
+            recovered = cycles[-1]["clean"]
+            time_to_recovery = sum(cycle["seconds"] for cycle in cycles)
+            total_requests = sum(sum(cycle["requests"].values()) for cycle in cycles)
+            result = {
+                "recovered": recovered,
+                "cycles": len(cycles),
+                "failed_cycles": sum(not cycle["success"] for cycle in cycles),
+                "time_to_recovery_s": round(time_to_recovery, 3) if recovered else None,
+                "wasted_requests": total_requests - healthy_total if recovered else total_requests,
+                "faults_served": state["faults"],
+                "first_cycle_s": round(cycles[0]["seconds"], 3),
+                "latency_inflation": round(cycles[0]["seconds"] / baseline_seconds, 1),
+                "cycle_requests": [cycle["requests"] for cycle in cycles],
+            }
+            report["scenarios"][name] = result
+            ttr = f"{time_to_recovery:.2f}" if recovered else "-"
+            print(f"{name:<24}{str(recovered):>10}{len(cycles):>8}{ttr:>9}{result['wasted_requests']:>8}"
+                  f"{result['faults_served']:>8}{result['latency_inflation']:>10.1f}x")
+    
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+def main(argv):
+    """Command line entry point for the benchmarks"""
+    parser = argparse.ArgumentParser(description="Amazon Affiliate Bot benchmarks and fault harness")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    bench_scoring = subparsers.add_parser("scoring", help="Benchmark the product scoring engine")
+    bench_scoring.add_argument("--items", type=int, default=100_000)
+    bench_scoring.add_argument("--k", type=int, default=3)
+    bench_scoring.add_argument("--repeat", type=int, default=50)
+    bench_scoring.add_argument("--seed", type=int, default=42)
+    bench_scoring.set_defaults(handler=benchmark_scoring)
+    
+    bench_validator = subparsers.add_parser("validator", help="Benchmark ASIN validation against a local stand-in")
+    bench_validator.add_argument("--asins", type=int, default=5000)
+    bench_validator.add_argument("--concurrency", type=int, default=64)
+    bench_validator.add_argument("--latency-ms", type=float, default=20)
+    bench_validator.add_argument("--interval-ms", type=float, default=0)
+    bench_validator.add_argument("--data-dir", default=os.getenv('BOT_DATA_DIR', 'data'))
+    bench_validator.set_defaults(handler=benchmark_validator)
+    
+    soak = subparsers.add_parser("soak", help="Check memory stays flat over many cycles against canned upstreams")
+    soak.add_argument("--cycles", type=int, default=5000)
+    soak.add_argument("--max-growth-mb", type=float, default=2.0, help="Allowed traced-heap growth after warm-up")
+    soak.set_defaults(handler=run_soak)
+    
+    bench_clicks = subparsers.add_parser("clicks", help="Benchmark Bitly click ingestion against a local stand-in")
+    bench_clicks.add_argument("--links", type=int, default=20000)
+    bench_clicks.add_argument("--new-links", type=int, default=300)
+    bench_clicks.add_argument("--days", type=int, default=30)
+    bench_clicks.add_argument("--click-rate", type=int, default=3, help="Percent of links clicked per day")
+    bench_clicks.add_argument("--seed", type=int, default=7)
+    bench_clicks.set_defaults(handler=benchmark_click_ingestion)
+    
+    bench_sanitizer = subparsers.add_parser("sanitizer", help="Benchmark the HTML sanitizer on large and pathological inputs")
+    bench_sanitizer.add_argument("--sizes-kb", type=float, nargs="+", default=[100, 200, 400])
+    bench_sanitizer.add_argument("--repeat", type=int, default=3)
+    bench_sanitizer.set_defaults(handler=benchmark_sanitizer)
+    
+    bench_updates = subparsers.add_parser("updates", help="Benchmark post updates against a local Blogger stand-in")
+    bench_updates.add_argument("--posts", type=int, default=50000)
+    bench_updates.add_argument("--changed", type=float, default=0.02, help="Fraction of products whose facts change")
+    bench_updates.add_argument("--rate", type=float, default=1000)
+    bench_updates.add_argument("--batch-size", type=int, default=50)
+    bench_updates.add_argument("--seed", type=int, default=3)
+    bench_updates.set_defaults(handler=benchmark_post_updates)
+    
+    bench_coordination = subparsers.add_parser("coordination", help="Benchmark lease coordination across worker processes")
+    bench_coordination.add_argument("--instances", type=int, nargs="+", default=[1, 2, 4, 8])
+    bench_coordination.add_argument("--products", type=int, default=400)
+    bench_coordination.add_argument("--latency-ms", type=float, default=25, help="Simulated publish latency")
+    bench_coordination.add_argument("--lease-ttl", type=float, default=3.0)
+    bench_coordination.set_defaults(handler=benchmark_coordination)
+    
+    fault_harness = subparsers.add_parser("fault-harness", help="Measure recovery from scripted upstream faults")
+    fault_harness.add_argument("--scenario", action="append", choices=sorted(FAULT_SCENARIOS),
+                               help="Scenario to run (repeatable; default: all)")
+    fault_harness.add_argument("--max-cycles", type=int, default=5, help="Give up on recovery after this many cycles")
+    fault_harness.add_argument("--timeout-scale", type=float, default=0.02,
+                               help="Multiplier for request timeouts and retry delays (1 = production values)")
+    fault_harness.add_argument("--hang", type=float, default=3.0, help="Seconds a hanging upstream takes to answer")
+    fault_harness.add_argument("--baseline-cycles", type=int, default=5)
+    fault_harness.add_argument("--report", help="Also write the JSON report to this path")
+    fault_harness.add_argument("--verbose", action="store_true", help="Show the bot's log output")
+    fault_harness.set_defaults(handler=run_fault_harness)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))